@@ -0,0 +1,35 @@
+"""add course capacity and enrolled_count
+
+Revision ID: 7a1e5c3b9f42
+Revises: 3c9e4b7a1d20
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1e5c3b9f42'
+down_revision: Union[str, None] = '3c9e4b7a1d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('courses', sa.Column('capacity', sa.Integer(), nullable=True))
+    op.add_column('courses', sa.Column('enrolled_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('courses', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    # Заполняем счётчики по уже существующим записям
+    op.execute(
+        "UPDATE courses SET enrolled_count = "
+        "(SELECT count(*) FROM enrollments WHERE enrollments.course_id = courses.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('courses', 'version')
+    op.drop_column('courses', 'enrolled_count')
+    op.drop_column('courses', 'capacity')
@@ -0,0 +1,33 @@
+"""number enrollment events in commit order
+
+Revision ID: a4d9e2b7c315
+Revises: e3a7c1f8b2d5
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e2b7c315'
+down_revision: Union[str, None] = 'e3a7c1f8b2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('enrollment_events', sa.Column('seq', sa.BigInteger(), nullable=True))
+    # Уже записанные события зафиксированы — их номер совпадает с id
+    op.execute("UPDATE enrollment_events SET seq = id")
+    op.create_index('ix_enrollment_events_seq', 'enrollment_events', ['seq'], unique=True)
+    op.create_index('ix_enrollment_events_unsequenced', 'enrollment_events', ['id'], unique=False,
+                    postgresql_where=sa.text('seq IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_enrollment_events_unsequenced', table_name='enrollment_events')
+    op.drop_index('ix_enrollment_events_seq', table_name='enrollment_events')
+    op.drop_column('enrollment_events', 'seq')
@@ -0,0 +1,66 @@
+"""add daily analytics rollups
+
+Revision ID: b58f2d9c4e61
+Revises: 7a1e5c3b9f42
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b58f2d9c4e61'
+down_revision: Union[str, None] = '7a1e5c3b9f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('enrollments', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('leaves', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('active_users', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('course_daily_stats',
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('enrollments', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('leaves', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.PrimaryKeyConstraint('course_id', 'day')
+    )
+    op.create_index('ix_course_daily_stats_day', 'course_daily_stats', ['day'], unique=False)
+    op.create_table('user_daily_activity',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    # Заполняем агрегаты по существующим записям; выходы с курсов раньше не сохранялись
+    op.execute(
+        "INSERT INTO course_daily_stats (course_id, day, enrollments, leaves) "
+        "SELECT course_id, enrolled_at::date, count(*), 0 FROM enrollments "
+        "WHERE enrolled_at IS NOT NULL GROUP BY course_id, enrolled_at::date"
+    )
+    op.execute(
+        "INSERT INTO user_daily_activity (user_id, day) "
+        "SELECT DISTINCT user_id, enrolled_at::date FROM enrollments WHERE enrolled_at IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO daily_stats (day, enrollments, leaves, active_users) "
+        "SELECT day, sum(enrollments), 0, "
+        "(SELECT count(*) FROM user_daily_activity a WHERE a.day = c.day) "
+        "FROM course_daily_stats c GROUP BY day"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_daily_activity')
+    op.drop_index('ix_course_daily_stats_day', table_name='course_daily_stats')
+    op.drop_table('course_daily_stats')
+    op.drop_table('daily_stats')
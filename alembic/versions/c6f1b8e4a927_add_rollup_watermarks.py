@@ -0,0 +1,35 @@
+"""add rollup watermarks
+
+Revision ID: c6f1b8e4a927
+Revises: a4d9e2b7c315
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f1b8e4a927'
+down_revision: Union[str, None] = 'a4d9e2b7c315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rollup_watermarks',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Уже записанные события учтены в агрегатах в своих транзакциях
+    op.execute(
+        "INSERT INTO rollup_watermarks (name, seq) "
+        "SELECT 'daily', coalesce(max(seq), 0) FROM enrollment_events"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_watermarks')
@@ -0,0 +1,28 @@
+"""add broadcast lease
+
+Revision ID: d2b7e5a3f184
+Revises: c6f1b8e4a927
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7e5a3f184'
+down_revision: Union[str, None] = 'c6f1b8e4a927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('broadcasts', sa.Column('owner', sa.String(), nullable=True))
+    op.add_column('broadcasts', sa.Column('lease_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('broadcasts', 'lease_until')
+    op.drop_column('broadcasts', 'owner')
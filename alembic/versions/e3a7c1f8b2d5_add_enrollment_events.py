@@ -0,0 +1,41 @@
+"""add enrollment events log
+
+Revision ID: e3a7c1f8b2d5
+Revises: b58f2d9c4e61
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c1f8b2d5'
+down_revision: Union[str, None] = 'b58f2d9c4e61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('enrollment_events',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Текущие записи попадают в журнал как события enroll в порядке записи
+    op.execute(
+        "INSERT INTO enrollment_events (kind, user_id, course_id, created_at) "
+        "SELECT 'enroll', user_id, course_id, coalesce(enrolled_at, now()) FROM enrollments "
+        "ORDER BY enrolled_at, id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('enrollment_events')
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+
+from sqlalchemy import Date, Integer, bindparam, cast, desc, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.events import ENROLL
+from backend.models import Course, DailyStats, CourseDailyStats, UserDailyActivity, EnrollmentEvent, \
+    RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+# Самый длинный период, за который отдаются агрегаты
+MAX_ANALYTICS_DAYS = 366
+# Сколько курсов показывать в сводке
+TOP_COURSES = 5
+
+# Имя отметки в rollup_watermarks и ключ advisory-блокировки сборщика агрегатов
+ROLLUP_WATERMARK = "daily"
+ROLLUP_LOCK_KEY = 0x726F6C6C  # "roll"
+# Сколько событий журнала переносится в агрегаты за одну транзакцию
+ROLLUP_BATCH_SIZE = 1000
+
+
+def rollup_stmt(day, events: list):
+    """Один запрос, который добавляет события журнала за день `day` к агрегатам.
+
+    WITH activity AS (INSERT INTO user_daily_activity ... ON CONFLICT DO NOTHING
+    RETURNING), course_rollup AS (INSERT INTO course_daily_stats ... ON CONFLICT
+    DO UPDATE) INSERT INTO daily_stats ... ON CONFLICT DO UPDATE: active_users
+    растёт только на пользователей, впервые активных в этот день. events —
+    строки с полями kind, user_id, course_id; их не больше ROLLUP_BATCH_SIZE,
+    поэтому число параметров запроса ограничено.
+    """
+    day = bindparam("rollup_day", day, type_=Date)
+    enrolled = Counter(event.course_id for event in events if event.kind == ENROLL)
+    left = Counter(event.course_id for event in events if event.kind != ENROLL)
+
+    activity = (
+        insert(UserDailyActivity)
+        .values([{"user_id": user_id, "day": day} for user_id in sorted({event.user_id for event in events})])
+        .on_conflict_do_nothing()
+        .returning(UserDailyActivity.user_id)
+        .cte("activity")
+    )
+
+    course_rows = insert(CourseDailyStats).values([
+        {"course_id": course_id, "day": day, "enrollments": enrolled[course_id], "leaves": left[course_id]}
+        for course_id in sorted(enrolled.keys() | left.keys())
+    ])
+    course_rollup = (
+        course_rows.on_conflict_do_update(
+            index_elements=[CourseDailyStats.course_id, CourseDailyStats.day],
+            set_={
+                "enrollments": CourseDailyStats.enrollments + course_rows.excluded.enrollments,
+                "leaves": CourseDailyStats.leaves + course_rows.excluded.leaves,
+            },
+        )
+        .returning(CourseDailyStats.course_id)
+        .cte("course_rollup")
+    )
+
+    daily = insert(DailyStats).values(
+        day=day,
+        enrollments=sum(enrolled.values()),
+        leaves=sum(left.values()),
+        active_users=select(func.count()).select_from(activity).scalar_subquery(),
+    )
+    return daily.on_conflict_do_update(
+        index_elements=[DailyStats.day],
+        set_={
+            "enrollments": DailyStats.enrollments + daily.excluded.enrollments,
+            "leaves": DailyStats.leaves + daily.excluded.leaves,
+            "active_users": DailyStats.active_users + daily.excluded.active_users,
+        },
+    ).add_cte(activity, course_rollup)
+
+
+async def rollup_events(db: AsyncSession) -> int:
+    """Перенести в агрегаты события журнала после отметки; возвращает их число.
+
+    Запись на курс и выход агрегаты не трогают — иначе все транзакции дня
+    ждали бы друг друга на одной строке daily_stats. Агрегаты собирает эта
+    функция: события читаются по seq пачками, и каждая пачка вместе с новой
+    отметкой фиксируется одной транзакцией, так что событие не посчитается
+    дважды. Advisory-блокировка не даёт нескольким процессам собирать
+    агрегаты одновременно. Читаются только события, которым events.run_sequencer
+    уже выдал seq.
+    """
+    processed = 0
+    while True:
+        await db.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_KEY)))
+        watermark = await db.scalar(
+            select(RollupWatermark.seq).filter(RollupWatermark.name == ROLLUP_WATERMARK)
+        ) or 0
+        events = (await db.execute(
+            select(EnrollmentEvent.seq, EnrollmentEvent.kind, EnrollmentEvent.user_id, EnrollmentEvent.course_id,
+                   cast(EnrollmentEvent.created_at, Date).label("day"))
+            .filter(EnrollmentEvent.seq > watermark)
+            .order_by(EnrollmentEvent.seq)
+            .limit(ROLLUP_BATCH_SIZE)
+        )).all()
+        if not events:
+            await db.commit()
+            return processed
+
+        by_day = defaultdict(list)
+        for event in events:
+            by_day[event.day].append(event)
+        for day, day_events in sorted(by_day.items()):
+            await db.execute(rollup_stmt(day, day_events))
+
+        mark = insert(RollupWatermark).values(name=ROLLUP_WATERMARK, seq=events[-1].seq)
+        await db.execute(mark.on_conflict_do_update(index_elements=[RollupWatermark.name],
+                                                    set_={"seq": mark.excluded.seq}))
+        await db.commit()
+        processed += len(events)
+        if len(events) < ROLLUP_BATCH_SIZE:
+            return processed
+
+
+async def run_rollups(session_factory, interval: float) -> None:
+    """Фоновая задача: раз в `interval` секунд переносит новые события в агрегаты."""
+    while True:
+        try:
+            async with session_factory() as db:
+                await rollup_events(db)
+        except Exception:
+            logger.exception("Не удалось обновить агрегаты аналитики")
+        await asyncio.sleep(interval)
+
+
+def _since(days: int):
+    """Первый день периода из `days` последних дней, включая сегодня."""
+    # Явный тип параметра: иначе Postgres выводит для "date - $1" вычитание дат
+    return func.current_date() - cast(days - 1, Integer)
+
+
+async def get_daily_stats(db: AsyncSession, days: int):
+    """Записи, выходы и активные пользователи по дням."""
+    result = await db.execute(select(DailyStats).filter(DailyStats.day >= _since(days)).order_by(DailyStats.day))
+    return result.scalars().all()
+
+
+async def get_course_daily_stats(db: AsyncSession, course_id: int, days: int):
+    """Записи и выходы по дням для одного курса."""
+    result = await db.execute(
+        select(CourseDailyStats)
+        .filter(CourseDailyStats.course_id == course_id, CourseDailyStats.day >= _since(days))
+        .order_by(CourseDailyStats.day)
+    )
+    return result.scalars().all()
+
+
+async def get_summary(db: AsyncSession, days: int) -> dict:
+    """Сводка за период: итоги по дневным строкам и самые популярные курсы."""
+    totals = (await db.execute(
+        select(
+            func.coalesce(func.sum(DailyStats.enrollments), 0),
+            func.coalesce(func.sum(DailyStats.leaves), 0),
+            func.coalesce(func.sum(DailyStats.active_users).filter(DailyStats.day == func.current_date()), 0),
+            func.coalesce(func.max(DailyStats.active_users), 0),
+        ).filter(DailyStats.day >= _since(days))
+    )).one()
+    enrollments, leaves, active_today, peak_active = totals
+
+    course_enrollments = func.sum(CourseDailyStats.enrollments)
+    top_courses = (await db.execute(
+        select(Course.id.label("course_id"), Course.title, course_enrollments.label("enrollments"),
+               func.sum(CourseDailyStats.leaves).label("leaves"))
+        .join(CourseDailyStats, CourseDailyStats.course_id == Course.id)
+        .filter(CourseDailyStats.day >= _since(days))
+        .group_by(Course.id)
+        .order_by(desc(course_enrollments), Course.id)
+        .limit(TOP_COURSES)
+    )).mappings().all()
+
+    return {
+        "days": days,
+        "enrollments": enrollments,
+        "leaves": leaves,
+        "net": enrollments - leaves,
+        "churn_rate": round(leaves / enrollments, 4) if enrollments else 0.0,
+        "active_users_today": active_today,
+        "peak_active_users": peak_active,
+        "top_courses": top_courses,
+    }
@@ -0,0 +1,159 @@
+import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from config import settings
+
+
+class CacheBackend:
+    """Хранилище кэша ответов.
+
+    Значения — готовые байты, поэтому интерфейс повторяет подмножество
+    Redis (GET, SET EX, DEL и удаление по префиксу через SCAN) и его можно
+    реализовать поверх локального Redis-совместимого сервера.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Кэш в памяти процесса с TTL и вытеснением LRU."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def create_cache_backend(name: str) -> CacheBackend:
+    if name == "memory":
+        return MemoryCacheBackend(maxsize=settings.RESPONSE_CACHE_SIZE)
+    raise ValueError(f"Неизвестный бэкенд кэша: {name}")
+
+
+@lru_cache(maxsize=None)
+def _adapter(type_) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def dump_json(type_, value) -> bytes:
+    """Сериализовать ORM-объекты по схеме ответа сразу в JSON-байты."""
+    adapter = _adapter(type_)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+class ResponseCache:
+    """Кэш сериализованных JSON-ответов горячих маршрутов чтения.
+
+    Запись хранится как строка заголовков в JSON, перевод строки и тело ответа.
+    Каждый сброс увеличивает `generation`: ответ, собранный во время сброса,
+    не сохраняется, как и версия в CatalogueVersion.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def respond(self, key: str, build: Callable[[], Awaitable[Tuple[bytes, dict]]]) -> Response:
+        """Вернуть ответ из кэша или собрать его через `build()` и сохранить."""
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            raw_headers, body = cached.split(b"\n", 1)
+            headers = json.loads(raw_headers)
+        else:
+            self.misses += 1
+            generation = self.generation
+            body, headers = await build()
+            # Если во время сборки прошла запись, ответ мог прочитать старые данные — не запоминаем его
+            if generation == self.generation:
+                await self.backend.set(key, json.dumps(headers).encode() + b"\n" + body, self.ttl)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *keys: str) -> None:
+        self.generation += 1
+        await self.backend.delete(*keys)
+
+    async def invalidate_prefix(self, prefix: str) -> None:
+        self.generation += 1
+        await self.backend.delete_prefix(prefix)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+response_cache = ResponseCache(create_cache_backend(settings.RESPONSE_CACHE_BACKEND), ttl=settings.RESPONSE_CACHE_TTL)
+
+
+# Ключи кэша
+COURSE_LIST_PREFIX = "courses:list:"
+
+
+def course_list_key(after, before, limit) -> str:
+    return f"{COURSE_LIST_PREFIX}{after}:{before}:{limit}"
+
+
+def course_key(course_id: int) -> str:
+    return f"courses:{course_id}"
+
+
+USER_COURSES_PREFIX = "user_courses:"
+
+
+def user_courses_prefix(user_id: int) -> str:
+    return f"{USER_COURSES_PREFIX}{user_id}:"
+
+
+def user_courses_key(user_id: int, after, before, limit) -> str:
+    return f"{user_courses_prefix(user_id)}{after}:{before}:{limit}"
@@ -1,28 +1,67 @@
+from datetime import timedelta
+
+from sqlalchemy import and_, case, delete, exists, func, literal, literal_column, or_, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from fastapi import HTTPException
 
 from backend import models
-from backend.models import Course, User, Enrollment
-from backend.schemas import CourseCreate, UserCreate, EnrollmentCreate
+from backend.cache import response_cache, COURSE_LIST_PREFIX, course_key, user_courses_prefix
+from backend.etag import catalogue_version
+from backend.events import append_events_stmt, ENROLL, LEAVE
+from backend.models import Course, User, Enrollment, Broadcast
+from backend.pagination import PageParams, keyset_page
+from backend.schemas import CourseCreate, UserCreate, EnrollmentCreate, UserResponse, BroadcastCreate, \
+    BroadcastClaim, BroadcastProgress
+
+
+# Размер пачки строк в одном многострочном INSERT
+BULK_CHUNK_SIZE = 1000
+
+
+def _chunks(items: list, size: int = BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _upsert_users_stmt(rows: list):
+    """INSERT ... ON CONFLICT (telegram_id) DO UPDATE, который не трогает строки с тем же именем."""
+    stmt = insert(User).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={"name": stmt.excluded.name},
+        where=User.name.is_distinct_from(stmt.excluded.name),
+    )
 
 
 # CRUD для пользователей
 async def create_or_update_user(db: AsyncSession, telegram_id: int, name: str):
-    """Создать или обновить пользователя по Telegram ID."""
-    result = await db.execute(select(User).filter(User.telegram_id == telegram_id))
-    user = result.scalar_one_or_none()
-
-    if user is None:
-        user = User(telegram_id=telegram_id, name=name)
-        db.add(user)
-    else:
-        if user.name != name:
-            user.name = name
+    """Создать или обновить пользователя по Telegram ID одним запросом.
+
+    INSERT ... ON CONFLICT (telegram_id) DO UPDATE ... WHERE name IS DISTINCT FROM
+    не пишет строку, если имя не изменилось; в этом случае существующий
+    пользователь возвращается из того же запроса веткой UNION ALL.
+    Если пользователя одновременно создал параллельный запрос, его строку не
+    видно в снимке этого запроса, и пользователь читается отдельным SELECT.
+    """
+    upsert = (
+        _upsert_users_stmt([{"telegram_id": telegram_id, "name": name}])
+        .returning(*User.__table__.c)
+        .cte("upsert")
+    )
+    unchanged = select(*User.__table__.c).filter(
+        User.telegram_id == telegram_id, ~exists(select(upsert.c.id))
+    )
+    stmt = select(User).from_statement(union_all(select(*upsert.c), unchanged))
 
     try:
+        result = await db.execute(stmt)
+        user = result.scalar_one_or_none()
+        if user is None:
+            user = (await db.execute(select(User).filter(User.telegram_id == telegram_id))).scalar_one()
         await db.commit()
-        await db.refresh(user)
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка при сохранении пользователя: {str(e)}")
@@ -30,10 +69,51 @@ async def create_or_update_user(db: AsyncSession, telegram_id: int, name: str):
     return user
 
 
-async def get_users(db: AsyncSession):
-    """Получить всех пользователей."""
-    result = await db.execute(select(User))
-    return result.scalars().all()
+async def bulk_upsert_users(db: AsyncSession, users: list):
+    """Создать или обновить пачку пользователей в одной транзакции.
+
+    Возвращает результат для каждой входной строки: created, updated,
+    unchanged или duplicate (повтор telegram_id внутри запроса).
+    """
+    rows = {}
+    for user in users:
+        rows[user.telegram_id] = {"telegram_id": user.telegram_id, "name": user.name}
+
+    written = {}
+    try:
+        for chunk in _chunks(list(rows.values())):
+            result = await db.execute(
+                _upsert_users_stmt(chunk).returning(
+                    User.id, User.telegram_id, literal_column("xmax = 0").label("inserted")
+                )
+            )
+            for user_id, telegram_id, inserted in result.all():
+                written[telegram_id] = (user_id, "created" if inserted else "updated")
+
+        unchanged = [telegram_id for telegram_id in rows if telegram_id not in written]
+        if unchanged:
+            result = await db.execute(select(User.id, User.telegram_id).filter(User.telegram_id.in_(unchanged)))
+            for user_id, telegram_id in result.all():
+                written[telegram_id] = (user_id, "unchanged")
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Ошибка при импорте пользователей: {str(e)}")
+
+    outcomes, seen = [], set()
+    for user in users:
+        if user.telegram_id in seen:
+            outcomes.append({"telegram_id": user.telegram_id, "id": written[user.telegram_id][0], "status": "duplicate"})
+            continue
+        seen.add(user.telegram_id)
+        user_id, status = written[user.telegram_id]
+        outcomes.append({"telegram_id": user.telegram_id, "id": user_id, "status": status})
+    return outcomes
+
+
+async def get_users(db: AsyncSession, params: PageParams):
+    """Получить страницу пользователей."""
+    return await keyset_page(db, select(User), User.id, params)
 
 
 async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int):
@@ -42,11 +122,26 @@ async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int):
     return result.scalar_one_or_none()
 
 
+async def get_user_session(db: AsyncSession, telegram_id: int):
+    """Получить пользователя и id его курсов одним запросом."""
+    course_ids = func.array_agg(Enrollment.course_id).filter(Enrollment.course_id.isnot(None))
+    result = await db.execute(
+        select(User, course_ids)
+        .outerjoin(Enrollment, Enrollment.user_id == User.id)
+        .filter(User.telegram_id == telegram_id)
+        .group_by(User.id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    user, ids = row
+    return {**UserResponse.model_validate(user, from_attributes=True).model_dump(), "course_ids": ids or []}
+
+
 # Функция для получения всех курсов
-async def get_courses(db: AsyncSession):
-    """Получить все курсы."""
-    result = await db.execute(select(Course))
-    return result.scalars().all()
+async def get_courses(db: AsyncSession, params: PageParams):
+    """Получить страницу курсов."""
+    return await keyset_page(db, select(Course), Course.id, params)
 
 
 async def get_course_by_id(db: AsyncSession, course_id: int):
@@ -68,6 +163,10 @@ async def create_course(db: AsyncSession, course: CourseCreate):
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка при создании курса: {str(e)}")
 
+    catalogue_version.bump()
+    # Новый курс меняет только страницы списка курсов
+    await response_cache.invalidate_prefix(COURSE_LIST_PREFIX)
+
     return new_course
 
 
@@ -83,52 +182,201 @@ async def get_enrollments_for_user_and_course(db: AsyncSession, user_id: int, co
 # CRUD для записей на курсы
 async def create_enrollment(db: AsyncSession, enrollment: EnrollmentCreate):
     """Создать новую запись на курс."""
-    # Проверяем, существует ли уже запись
-    existing_enrollment = await get_enrollments_for_user_and_course(db, enrollment.user_id, enrollment.course_id)
-    if existing_enrollment:
-        raise HTTPException(status_code=400, detail="User is already enrolled in this course")
+    return await enroll_user_on_course(db, enrollment.course_id, enrollment.user_id)
+
+
+# Функция для получения курсов для пользователя
+async def get_courses_for_user(db: AsyncSession, user_id: int, params: PageParams):
+    """Получить страницу курсов, на которые записан пользователь."""
+    return await keyset_page(
+        db, select(Course).join(Enrollment).filter(Enrollment.user_id == user_id), Course.id, params
+    )
+
 
-    # Создаем новую запись
-    new_enrollment = Enrollment(user_id=enrollment.user_id, course_id=enrollment.course_id)
-    db.add(new_enrollment)
+async def _record_enrollment_changes(db: AsyncSession, pairs: list, kind: str) -> None:
+    """Журнал событий для пар (user_id, course_id) — до commit той же транзакции."""
+    for chunk in _chunks(pairs):
+        await db.execute(append_events_stmt(chunk, kind))
 
+
+async def _course_counters_changed(course_id: int) -> None:
+    """Счётчик мест входит в ответы каталога — сбрасываем их кэш.
+
+    В списках «моих курсов» счётчика нет (UserCourseResponse), поэтому
+    страницы других пользователей не сбрасываются.
+    """
+    catalogue_version.bump()
+    await response_cache.invalidate(course_key(course_id))
+    await response_cache.invalidate_prefix(COURSE_LIST_PREFIX)
+
+
+async def _insert_enrollment(db: AsyncSession, course_id: int, user_id, *user_filters):
+    """Занять место и записать пользователя одним запросом.
+
+    WITH seat AS (UPDATE courses ... RETURNING id) INSERT INTO enrollments
+    SELECT ... FROM seat ... ON CONFLICT DO NOTHING RETURNING: место и запись
+    появляются атомарно, а блокировка строки курса не даёт превысить лимит.
+    Если ничего не вставилось (курс заполнен, нет пользователя или запись уже
+    есть), транзакция откатывается вместе с увеличением счётчика, и
+    возвращается None.
+    """
+    seat = (
+        update(Course)
+        .where(Course.id == course_id, or_(Course.capacity.is_(None), Course.enrolled_count < Course.capacity))
+        .values(enrolled_count=Course.enrolled_count + 1, version=Course.version + 1)
+        .returning(Course.id)
+        .cte("seat")
+    )
+    stmt = (
+        insert(Enrollment)
+        .from_select(["user_id", "course_id"], select(user_id, seat.c.id).filter(*user_filters))
+        .add_cte(seat)
+        .on_conflict_do_nothing(constraint="_user_course_uc")
+        .returning(Enrollment)
+    )
     try:
+        result = await db.execute(stmt)
+        new_enrollment = result.scalar_one_or_none()
+        if new_enrollment is None:
+            await db.rollback()
+            return None
+        await _record_enrollment_changes(db, [(new_enrollment.user_id, course_id)], ENROLL)
         await db.commit()
-        await db.refresh(new_enrollment)
-        return new_enrollment
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="User or course not found")
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка при записи на курс: {str(e)}")
 
+    await response_cache.invalidate_prefix(user_courses_prefix(new_enrollment.user_id))
+    await _course_counters_changed(course_id)
+    return new_enrollment
 
-# Функция для получения курсов для пользователя
-async def get_courses_for_user(db: AsyncSession, user_id: int):
-    """Получить все курсы, на которые записан пользователь."""
-    result = await db.execute(
-        select(Course).join(Enrollment).filter(Enrollment.user_id == user_id)
-    )
-    return result.scalars().all()
+
+async def _enrollment_rejected(db: AsyncSession, course_id: int, user_id) -> HTTPException:
+    """Редкий путь: выясняем, почему запись не состоялась."""
+    if user_id is None:
+        return HTTPException(status_code=404, detail="User not found")
+    course = await get_course_by_id(db, course_id)
+    if course is None:
+        return HTTPException(status_code=404, detail="Course not found")
+    if await get_enrollments_for_user_and_course(db, user_id, course_id) is not None:
+        return HTTPException(status_code=400, detail="User already enrolled in this course")
+    return HTTPException(status_code=409, detail="Course is full")
 
 
 # Функция для записи пользователя на курс
 async def enroll_user_on_course(db: AsyncSession, course_id: int, user_id: int):
-    """Записать пользователя на курс."""
-    existing_enrollment = await get_enrollments_for_user_and_course(db, user_id, course_id)
-    if existing_enrollment:
-        raise HTTPException(status_code=400, detail="User is already enrolled in this course")
+    """Записать пользователя на курс.
+
+    Один запрос занимает место и вставляет запись: повторную запись отсекает
+    уникальное ограничение _user_course_uc, заполненный курс — условие на
+    счётчике мест, без предварительных SELECT и COUNT(*).
+    """
+    new_enrollment = await _insert_enrollment(db, course_id, literal(user_id))
+    if new_enrollment is None:
+        user = await db.get(User, user_id)
+        raise await _enrollment_rejected(db, course_id, user.id if user else None)
+    return new_enrollment
+
+
+async def enroll_user_by_telegram_id(db: AsyncSession, course_id: int, telegram_id: int):
+    """Записать пользователя на курс по Telegram ID.
+
+    Внутренний id пользователя подставляется в том же INSERT ... SELECT
+    по индексу users.telegram_id, без отдельного запроса пользователя.
+    """
+    new_enrollment = await _insert_enrollment(db, course_id, User.id, User.telegram_id == telegram_id)
+    if new_enrollment is None:
+        user = await get_user_by_telegram_id(db, telegram_id)
+        raise await _enrollment_rejected(db, course_id, user.id if user else None)
+    return new_enrollment
 
-    # Создание новой записи на курс
-    new_enrollment = Enrollment(user_id=user_id, course_id=course_id)
-    db.add(new_enrollment)
 
+async def bulk_enroll(db: AsyncSession, enrollments: list):
+    """Записать пачку пар (user_id, course_id) в одной транзакции.
+
+    Несуществующие пользователи и курсы отсеиваются заранее; строки затронутых
+    курсов блокируются (SELECT ... FOR UPDATE), и свободные места
+    распределяются по порядку запроса. Остальные пары вставляются многострочным
+    INSERT ... ON CONFLICT DO NOTHING, а счётчики курсов обновляются одним UPDATE
+    (журнал событий — в той же транзакции).
+    """
+    pairs = list(dict.fromkeys((item.user_id, item.course_id) for item in enrollments))
+    user_ids = {user_id for user_id, _ in pairs}
+    course_ids = {course_id for _, course_id in pairs}
+
+    statuses, valid, created = {}, [], set()
     try:
+        known_users = set((await db.execute(select(User.id).filter(User.id.in_(user_ids)))).scalars().all())
+        seats = {
+            course_id: None if capacity is None else capacity - enrolled_count
+            for course_id, capacity, enrolled_count in (await db.execute(
+                select(Course.id, Course.capacity, Course.enrolled_count)
+                .filter(Course.id.in_(course_ids))
+                .order_by(Course.id)
+                .with_for_update()
+            )).all()
+        }
+        existing = set((await db.execute(
+            select(Enrollment.user_id, Enrollment.course_id)
+            .filter(Enrollment.user_id.in_(known_users), Enrollment.course_id.in_(seats))
+        )).tuples().all())
+        for user_id, course_id in pairs:
+            if user_id not in known_users:
+                statuses[(user_id, course_id)] = "user_not_found"
+            elif course_id not in seats:
+                statuses[(user_id, course_id)] = "course_not_found"
+            elif (user_id, course_id) in existing:
+                statuses[(user_id, course_id)] = "already_enrolled"
+            elif seats[course_id] is not None and seats[course_id] <= 0:
+                statuses[(user_id, course_id)] = "course_full"
+            else:
+                if seats[course_id] is not None:
+                    seats[course_id] -= 1
+                valid.append((user_id, course_id))
+
+        for chunk in _chunks(valid):
+            result = await db.execute(
+                insert(Enrollment)
+                .values([{"user_id": user_id, "course_id": course_id} for user_id, course_id in chunk])
+                .on_conflict_do_nothing(constraint="_user_course_uc")
+                .returning(Enrollment.user_id, Enrollment.course_id)
+            )
+            created.update(tuple(row) for row in result.all())
+
+        added = {}
+        for _, course_id in created:
+            added[course_id] = added.get(course_id, 0) + 1
+        if added:
+            increment = case(added, value=Course.id)
+            await db.execute(
+                update(Course)
+                .where(Course.id.in_(added))
+                .values(enrolled_count=Course.enrolled_count + increment, version=Course.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            await _record_enrollment_changes(db, sorted(created), ENROLL)
         await db.commit()
-        await db.refresh(new_enrollment)
     except Exception as e:
         await db.rollback()
-        raise HTTPException(status_code=500, detail=f"Ошибка при записи на курс: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при пакетной записи на курсы: {str(e)}")
 
-    return new_enrollment
+    for pair in valid:
+        statuses[pair] = "created" if pair in created else "already_enrolled"
+    for user_id in {user_id for user_id, _ in created}:
+        await response_cache.invalidate_prefix(user_courses_prefix(user_id))
+    for course_id in added:
+        await _course_counters_changed(course_id)
+
+    outcomes, seen = [], set()
+    for item in enrollments:
+        pair = (item.user_id, item.course_id)
+        outcomes.append({"user_id": item.user_id, "course_id": item.course_id,
+                         "status": "duplicate" if pair in seen else statuses[pair]})
+        seen.add(pair)
+    return outcomes
 
 
 async def get_enrollment_by_user_and_course(db: AsyncSession, user_id: int, course_id: int):
@@ -139,17 +387,137 @@ async def get_enrollment_by_user_and_course(db: AsyncSession, user_id: int, cour
     return enrollment
 
 
-# Функция для удаления записи
-async def remove_enrollment(db: AsyncSession, enrollment_id: int):
-    print(f"Attempting to delete enrollment with ID: {enrollment_id}")
-    stmt = select(Enrollment).filter(Enrollment.id == enrollment_id)
-    result = await db.execute(stmt)
-    enrollment = result.scalars().first()
-    if not enrollment:
-        print(f"No enrollment found with ID {enrollment_id}")
+async def _delete_enrollment(db: AsyncSession, user_filter, course_id: int):
+    """Освободить место и удалить запись.
+
+    Строка курса блокируется первой (UPDATE счётчика), а запись — второй, в
+    том же порядке, что и при записи на курс (seat CTE, затем INSERT), иначе
+    встречные запись и выход могли бы взаимно заблокироваться.
+    """
+    enrollment_filter = and_(user_filter, Enrollment.course_id == course_id)
+    seat = await db.execute(
+        update(Course)
+        .where(Course.id == course_id, exists(select(Enrollment.id).filter(enrollment_filter)))
+        .values(enrolled_count=Course.enrolled_count - 1, version=Course.version + 1)
+        .returning(Course.id)
+        .execution_options(synchronize_session=False)
+    )
+    if seat.first() is None:
+        await db.rollback()
+        return None
+
+    result = await db.execute(
+        delete(Enrollment)
+        .where(enrollment_filter)
+        .returning(Enrollment.user_id, Enrollment.course_id, Enrollment.enrolled_at)
+    )
+    enrollment = result.one_or_none()
+    if enrollment is None:
+        # Запись удалил параллельный выход, пока мы ждали блокировку курса
+        await db.rollback()
         return None
-    print(f"Found enrollment: {enrollment}")
-    await db.delete(enrollment)
+
+    # Выход попадает в журнал в той же транзакции
+    await _record_enrollment_changes(db, [(enrollment.user_id, course_id)], LEAVE)
     await db.commit()
-    print(f"Deleted enrollment: {enrollment}")
+
+    await response_cache.invalidate_prefix(user_courses_prefix(enrollment.user_id))
+    await _course_counters_changed(course_id)
     return enrollment
+
+
+# Функция для удаления записи
+async def remove_enrollment(db: AsyncSession, user_id: int, course_id: int):
+    """Удалить запись на курс. Возвращает None, если записи не было."""
+    return await _delete_enrollment(db, Enrollment.user_id == user_id, course_id)
+
+
+async def remove_enrollment_by_telegram_id(db: AsyncSession, course_id: int, telegram_id: int):
+    """Удалить запись на курс по Telegram ID; пользователь ищется подзапросом в том же DELETE."""
+    user_id = select(User.id).filter(User.telegram_id == telegram_id).scalar_subquery()
+    return await _delete_enrollment(db, Enrollment.user_id == user_id, course_id)
+
+
+# CRUD для рассылок
+async def create_broadcast(db: AsyncSession, broadcast: BroadcastCreate):
+    """Создать рассылку студентам курса."""
+    new_broadcast = Broadcast(course_id=broadcast.course_id, text=broadcast.text)
+    db.add(new_broadcast)
+
+    try:
+        await db.commit()
+        await db.refresh(new_broadcast)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Course not found")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Ошибка при создании рассылки: {str(e)}")
+
+    return new_broadcast
+
+
+async def get_active_broadcasts(db: AsyncSession):
+    """Получить незавершённые рассылки (для продолжения после перезапуска бота)."""
+    result = await db.execute(select(Broadcast).filter(Broadcast.status == "running").order_by(Broadcast.id))
+    return result.scalars().all()
+
+
+async def get_broadcast_recipients(db: AsyncSession, course_id: int, after: int, limit: int):
+    """Получить следующую пачку студентов курса по возрастанию users.id."""
+    stmt = (
+        select(User.id.label("user_id"), User.telegram_id)
+        .join(Enrollment, Enrollment.user_id == User.id)
+        .filter(Enrollment.course_id == course_id)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.filter(User.id > after)
+    result = await db.execute(stmt)
+    return result.mappings().all()
+
+
+def _lease_until(lease_seconds: int):
+    return func.now() + timedelta(seconds=lease_seconds)
+
+
+async def claim_broadcast(db: AsyncSession, broadcast_id: int, claim: BroadcastClaim):
+    """Арендовать незавершённую рассылку для процесса бота; None, если её выполняет другой процесс.
+
+    Аренда — условный UPDATE: рассылку получает процесс, который уже владеет
+    ею, или любой, если аренда истекла. Так две реплики бота не отправляют
+    одну рассылку одновременно, а рассылку упавшей реплики подхватывает
+    другая по истечении аренды.
+    """
+    result = await db.execute(
+        update(Broadcast)
+        .where(
+            Broadcast.id == broadcast_id,
+            Broadcast.status == "running",
+            or_(Broadcast.owner.is_(None), Broadcast.owner == claim.owner, Broadcast.lease_until < func.now()),
+        )
+        .values(owner=claim.owner, lease_until=_lease_until(claim.lease_seconds))
+        .returning(Broadcast)
+    )
+    broadcast = result.scalar_one_or_none()
+    await db.commit()
+    return broadcast
+
+
+async def update_broadcast_progress(db: AsyncSession, broadcast_id: int, progress: BroadcastProgress):
+    """Сохранить прогресс рассылки и продлить аренду одним UPDATE ... RETURNING.
+
+    Прогресс принимается только от владельца аренды; None — рассылки нет
+    или её уже выполняет другой процесс.
+    """
+    result = await db.execute(
+        update(Broadcast)
+        .where(Broadcast.id == broadcast_id, Broadcast.owner == progress.owner)
+        .values(**progress.model_dump(exclude={"owner", "lease_seconds"}),
+                lease_until=_lease_until(progress.lease_seconds))
+        .returning(Broadcast)
+    )
+    broadcast = result.scalar_one_or_none()
+    await db.commit()
+    return broadcast
@@ -1,18 +1,173 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import greenlet
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
 from ssl import create_default_context
 
 # Создаем базовый класс для моделей
 Base = declarative_base()
 
-ctx = create_default_context(
-    cafile=settings.SSL_CERT_PATH
-)
+logger = logging.getLogger(__name__)
+
+
+def _connect_args() -> dict:
+    """Параметры подключения asyncpg; другим драйверам (aiosqlite в бенчмарках) они не передаются."""
+    if not settings.DATABASE_URL.startswith("postgresql+asyncpg"):
+        return {}
+    connect_args = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    if settings.SSL_CERT_PATH:
+        connect_args["ssl"] = create_default_context(cafile=settings.SSL_CERT_PATH)
+    return connect_args
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, который считает выдачи, ожидание свободного слота и подключения.
+
+    Ожидание слота и время подключения нового соединения считаются отдельно:
+    медленная база и исчерпанный пул лечатся по-разному.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waiting = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_errors = 0
+        self.connect_time_total = 0.0
+        self.connect_time_max = 0.0
+        # Гринлеты, которые сейчас внутри _do_get: QueuePool вызывает его рекурсивно
+        self._getting = set()
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            record = super()._create_connection()
+        except Exception:
+            self.connect_errors += 1
+            raise
+        elapsed = time.perf_counter() - start
+        self.connects += 1
+        self.connect_time_total += elapsed
+        self.connect_time_max = max(self.connect_time_max, elapsed)
+        # _do_get вычтет это время из ожидания слота
+        record.connect_time = elapsed
+        return record
+
+    def _do_get(self):
+        current = greenlet.getcurrent()
+        if current in self._getting:
+            return super()._do_get()
+
+        self._getting.add(current)
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self._add_wait(time.perf_counter() - start)
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+            self._getting.discard(current)
+        self._add_wait(time.perf_counter() - start - connection.__dict__.pop("connect_time", 0.0))
+        self.checkouts += 1
+        return connection
+
+    def _add_wait(self, elapsed: float) -> None:
+        self.wait_time_total += elapsed
+        self.wait_time_max = max(self.wait_time_max, elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_max": self.wait_time_max,
+            "connects": self.connects,
+            "connect_errors": self.connect_errors,
+            "connect_time_total": self.connect_time_total,
+            "connect_time_max": self.connect_time_max,
+        }
 
 
 # Создание асинхронного движка для работы с PostgreSQL
-engine = create_async_engine(settings.DATABASE_URL, connect_args={"ssl": ctx}, echo=True)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    connect_args=_connect_args(),
+    echo=settings.DB_ECHO,
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+
+
+class QueryStats:
+    """Запросы к базе в рамках одного HTTP-запроса: число, суммарное время, самый медленный."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+    def add(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+
+# Статистика текущего HTTP-запроса; её выставляет middleware в backend/main.py
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _redacted(statement: str, parameters) -> str:
+    """Текст запроса без значений параметров: в лог попадает только их число."""
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+        size = f"{len(parameters)} наборов параметров"
+    else:
+        size = f"{len(parameters or ())} параметров"
+    return f"{' '.join(statement.split())} [{size} скрыто]"
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started_at = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started_at
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    if settings.DB_SLOW_QUERY_MS and elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        logger.warning("Медленный запрос %.1f мс (%s): %s", elapsed * 1000,
+                       stats.label if stats is not None else "вне запроса", _redacted(statement, parameters))
+
 
 # Создаем сессию AsyncSession
 AsyncSessionLocal = async_sessionmaker(
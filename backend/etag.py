@@ -0,0 +1,92 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.models import Course
+from config import settings
+
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из произвольных частей."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Проверить заголовок If-None-Match."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> None:
+    """Добавить ETag и Last-Modified в ответ."""
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Ответ 304 без тела."""
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+class CatalogueVersion:
+    """Версия каталога курсов для ETag.
+
+    Версия считается одним агрегатным запросом (число курсов, максимальный id,
+    created_at и сумма версий курсов, растущих при записи и выходе) и запоминается на `ttl` секунд. Записи через этот процесс
+    сбрасывают запомненное значение сразу (`bump`), а другие процессы увидят
+    изменение не позже чем через `ttl`.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.generation = 0
+        self._cached = None
+        self._expires_at = 0.0
+
+    def bump(self) -> None:
+        self.generation += 1
+        self._cached = None
+
+    async def get(self, db: AsyncSession):
+        """Вернуть пару (etag, last_modified) каталога."""
+        if self._cached is not None and time.monotonic() < self._expires_at:
+            return self._cached
+
+        generation = self.generation
+        result = await db.execute(
+            select(func.count(Course.id), func.max(Course.id), func.max(Course.created_at), func.sum(Course.version))
+        )
+        count, max_id, last_modified, versions = result.one()
+        version = (make_etag("courses", count, max_id, last_modified, versions), last_modified)
+
+        # Если во время запроса прошла запись, не запоминаем устаревшую версию
+        if generation == self.generation:
+            self._cached = version
+            self._expires_at = time.monotonic() + self.ttl
+        return version
+
+
+catalogue_version = CatalogueVersion(ttl=settings.ETAG_VERSION_TTL)
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import EnrollmentEvent, User
+
+logger = logging.getLogger(__name__)
+
+# Виды событий журнала
+ENROLL = "enroll"
+LEAVE = "leave"
+
+# Ключ advisory-блокировки, под которой выдаются номера событий
+EVENTS_LOCK_KEY = 0x656E726C  # "enrl"
+# Сколько событий нумеровать за один запрос
+SEQUENCE_BATCH_SIZE = 10000
+
+
+def append_events_stmt(pairs: list, kind: str):
+    """INSERT пар (user_id, course_id) в журнал; номер seq событиям выдаётся позже."""
+    return insert(EnrollmentEvent).values(
+        [{"kind": kind, "user_id": user_id, "course_id": course_id} for user_id, course_id in pairs]
+    )
+
+
+async def sequence_events(db: AsyncSession) -> int:
+    """Выдать номера seq зафиксированным событиям и зафиксировать их; возвращает их число.
+
+    id из последовательности становятся видны не в порядке выдачи: событие
+    с меньшим id может зафиксироваться позже, и потребитель, читающий по id,
+    его пропустит. Поэтому потребители читают по seq, который выдаётся уже
+    зафиксированным событиям: max(seq) + номер по id под advisory-блокировкой.
+    Незафиксированные события здесь не видны и получат номер больше при
+    следующем вызове. Нумерует фоновая задача (`run_sequencer`): запись на
+    курс, выход и чтение ленты блокировку не берут. Если ненумерованных
+    событий нет, обходимся одним чтением по частичному индексу.
+    """
+    if not await db.scalar(select(exists().where(EnrollmentEvent.seq.is_(None)))):
+        await db.rollback()
+        return 0
+    await db.execute(select(func.pg_advisory_xact_lock(EVENTS_LOCK_KEY)))
+    pending = (
+        select(EnrollmentEvent.id, func.row_number().over(order_by=EnrollmentEvent.id).label("position"))
+        .filter(EnrollmentEvent.seq.is_(None))
+        .order_by(EnrollmentEvent.id)
+        .limit(SEQUENCE_BATCH_SIZE)
+        .subquery()
+    )
+    last_seq = select(func.coalesce(func.max(EnrollmentEvent.seq), 0)).scalar_subquery()
+    result = await db.execute(
+        update(EnrollmentEvent)
+        .where(EnrollmentEvent.id == pending.c.id)
+        .values(seq=last_seq + pending.c.position)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def run_sequencer(session_factory, interval: float) -> None:
+    """Фоновая задача: раз в `interval` секунд нумерует новые события журнала."""
+    while True:
+        try:
+            async with session_factory() as db:
+                while await sequence_events(db) == SEQUENCE_BATCH_SIZE:
+                    pass
+        except Exception:
+            logger.exception("Не удалось пронумеровать события журнала")
+        await asyncio.sleep(interval)
+
+
+async def get_events(db: AsyncSession, after: int, limit: int):
+    """События с seq больше `after` по возрастанию seq, не больше `limit` штук.
+
+    Только чтение: события без seq (ещё не пронумерованные) появятся в ленте
+    после следующего прохода run_sequencer.
+    """
+    result = await db.execute(
+        select(EnrollmentEvent.seq, EnrollmentEvent.id, EnrollmentEvent.kind, EnrollmentEvent.user_id,
+               User.telegram_id, EnrollmentEvent.course_id, EnrollmentEvent.created_at)
+        .join(User, User.id == EnrollmentEvent.user_id)
+        .filter(EnrollmentEvent.seq > after)
+        .order_by(EnrollmentEvent.seq)
+        .limit(limit)
+    )
+    return result.mappings().all()
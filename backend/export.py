@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from backend.database import AsyncSessionLocal
+from backend.models import User, Course, Enrollment
+
+# Сколько строк забирать с сервера за раз и отдавать одним куском ответа
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Выгружаемые таблицы: только колонки, без ORM-объектов
+EXPORTS = {
+    "users": select(User.id, User.telegram_id, User.name, User.email, User.created_at).order_by(User.id),
+    "courses": select(Course.id, Course.title, Course.description, Course.created_at).order_by(Course.id),
+    "enrollments": select(
+        Enrollment.id, Enrollment.user_id, User.telegram_id, Enrollment.course_id, Enrollment.enrolled_at
+    ).join(User, User.id == Enrollment.user_id).order_by(Enrollment.id),
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Неподдерживаемый тип: {type(value)}")
+
+
+def _format_csv(columns, rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _format_ndjson(columns, rows) -> str:
+    return "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) + "\n"
+                   for row in rows)
+
+
+async def stream_export(name: str, fmt: str):
+    """Построчная выгрузка таблицы через серверный курсор.
+
+    Сессия открывается внутри генератора, а не через `get_db`: зависимость
+    закрывается раньше, чем StreamingResponse дочитает ответ. В памяти
+    одновременно держится не больше `EXPORT_CHUNK_SIZE` строк.
+    """
+    stmt = EXPORTS[name].execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        columns = list(result.keys())
+        if fmt == "csv":
+            # Заголовок уходит сразу, ещё до первой пачки строк
+            yield _format_csv(columns, [], header=True)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                yield _format_csv(columns, rows, header=False)
+            else:
+                yield _format_ndjson(columns, rows)
@@ -1,14 +1,56 @@
 # backend/main.py
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from backend.routers import courses, users, enrollments  # Подключаем роутеры
+from backend.routers import courses, users, enrollments, stats, broadcasts, exports, metrics, analytics, \
+    events  # Подключаем роутеры
+
+from backend.analytics import run_rollups
+from backend.database import AsyncSessionLocal
+from backend.events import run_sequencer
+from backend.metrics import metrics_middleware
+from backend.request_context import request_id_middleware
+from backend.timing import query_timing_middleware
+from config import settings
+from log_setup import setup_logging
+
+# Логи пишутся из отдельного потока JSON-строками с id запроса
+setup_logging(settings.LOG_LEVEL, levels=settings.LOG_LEVELS, fmt=settings.LOG_FORMAT, sample=settings.LOG_SAMPLE)
+
+
+# Фоновые задачи на время работы приложения: нумерация событий журнала и сборка
+# агрегатов аналитики из него
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [asyncio.create_task(run_sequencer(AsyncSessionLocal, settings.EVENTS_SEQUENCE_INTERVAL))]
+    if settings.ANALYTICS_ROLLUP_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_rollups(AsyncSessionLocal, settings.ANALYTICS_ROLLUP_INTERVAL)))
+    yield
+    for task in tasks:
+        task.cancel()
+
 
 # Создаем приложение FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Число запросов к базе и их время для каждого HTTP-запроса (заголовок Server-Timing)
+app.middleware("http")(query_timing_middleware)
+# Гистограммы времени ответа для /metrics
+app.middleware("http")(metrics_middleware)
+# Последний добавленный middleware выполняется первым: id запроса виден всем остальным
+app.middleware("http")(request_id_middleware)
 
 # Регистрируем роутеры с уникальными префиксами
 app.include_router(courses.router, prefix="/courses", tags=["Courses"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(enrollments.router, prefix="/enrollments", tags=["Enrollments"])
+app.include_router(broadcasts.router, prefix="/broadcasts", tags=["Broadcasts"])
+app.include_router(events.router, prefix="/events", tags=["Events"])
+app.include_router(exports.router, prefix="/export", tags=["Export"])
+app.include_router(stats.router, prefix="/stats", tags=["Stats"])
+app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 
 # Тестовый эндпоинт
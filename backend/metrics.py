@@ -0,0 +1,63 @@
+import time
+
+from fastapi import Request
+from prometheus_client import Gauge, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from backend.cache import response_cache
+from backend.database import engine
+from backend.timing import route_template
+
+REQUEST_LATENCY = Histogram(
+    "backend_http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+REQUESTS_IN_FLIGHT = Gauge("backend_http_requests_in_flight", "HTTP-запросы в обработке")
+
+
+class BackendStatsCollector:
+    """Пул соединений и кэш ответов: значения читаются в момент опроса /metrics."""
+
+    def collect(self):
+        pool = engine.pool.stats()
+        yield GaugeMetricFamily("backend_db_pool_checked_out", "Выданные соединения пула", value=pool["checked_out"])
+        yield GaugeMetricFamily("backend_db_pool_checked_in", "Свободные соединения пула", value=pool["checked_in"])
+        # overflow() отрицателен, пока пул не заполнен до pool_size
+        yield GaugeMetricFamily("backend_db_pool_overflow", "Соединения сверх pool_size",
+                                value=max(0, pool["overflow"]))
+        yield GaugeMetricFamily("backend_db_pool_waiting", "Ожидающие соединения", value=pool["waiting"])
+        yield CounterMetricFamily("backend_db_pool_checkouts", "Выдачи соединений", value=pool["checkouts"])
+        yield CounterMetricFamily("backend_db_pool_timeouts", "Таймауты выдачи соединений", value=pool["timeouts"])
+        yield CounterMetricFamily("backend_db_pool_wait_seconds", "Ожидание свободного слота пула",
+                                  value=pool["wait_time_total"])
+        yield CounterMetricFamily("backend_db_pool_connects", "Новые подключения к базе", value=pool["connects"])
+        yield CounterMetricFamily("backend_db_pool_connect_errors", "Ошибки подключения к базе",
+                                  value=pool["connect_errors"])
+        yield CounterMetricFamily("backend_db_pool_connect_seconds", "Время подключения к базе",
+                                  value=pool["connect_time_total"])
+
+        cache = response_cache.stats()
+        requests = CounterMetricFamily("backend_response_cache_requests", "Обращения к кэшу ответов",
+                                       labels=["result"])
+        requests.add_metric(["hit"], cache["hits"])
+        requests.add_metric(["miss"], cache["misses"])
+        yield requests
+
+
+REGISTRY.register(BackendStatsCollector())
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Гистограмма времени ответа по шаблону маршрута и число запросов в обработке."""
+    REQUESTS_IN_FLIGHT.inc()
+    started_at = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        REQUEST_LATENCY.labels(route_template(request), str(status)).observe(time.perf_counter() - started_at)
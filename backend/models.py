@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, BigInteger
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, UniqueConstraint, BigInteger, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base  # Базовый класс для моделей
@@ -10,6 +10,11 @@ class Course(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
+    # Число мест (None — без ограничений) и счётчик записей, который ведётся при записи и выходе
+    capacity = Column(Integer, nullable=True)
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Растёт при каждом изменении счётчика — входит в ETag каталога
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, server_default=func.now())
 
     enrollments = relationship("Enrollment", back_populates="course")
@@ -38,4 +43,86 @@ class Enrollment(Base):
     user = relationship("User", back_populates="enrollments")
     course = relationship("Course", back_populates="enrollments")
 
-    __table_args__ = (UniqueConstraint('user_id', 'course_id', name='_user_course_uc'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'course_id', name='_user_course_uc'),
+        # Выборка студентов курса по возрастанию user_id (рассылки)
+        Index('ix_enrollments_course_user', 'course_id', 'user_id'),
+    )
+
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String, nullable=False, server_default="running")  # running, done, failed, cancelled
+    cursor = Column(Integer, nullable=True)  # последний обработанный users.id
+    # Какой процесс бота выполняет рассылку и до какого времени; см. crud.claim_broadcast
+    owner = Column(String, nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    sent = Column(Integer, nullable=False, server_default="0")
+    failed = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    course = relationship("Course")
+
+
+# Журнал записей и выходов с курсов: строки только добавляются
+class EnrollmentEvent(Base):
+    __tablename__ = "enrollment_events"
+
+    id = Column(BigInteger, primary_key=True)
+    # Порядковый номер в порядке фиксации транзакций; выдаётся после commit (events.sequence_events)
+    seq = Column(BigInteger, nullable=True)
+    kind = Column(String, nullable=False)  # enroll, leave
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index('ix_enrollment_events_seq', 'seq', unique=True),
+        # Быстрый поиск событий, которым ещё не выдан номер
+        Index('ix_enrollment_events_unsequenced', 'id', postgresql_where=seq.is_(None)),
+    )
+
+
+# Дневные агрегаты для аналитики: собираются фоновой задачей из журнала событий (analytics.rollup_events)
+class DailyStats(Base):
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, primary_key=True)
+    enrollments = Column(Integer, nullable=False, server_default="0")
+    leaves = Column(Integer, nullable=False, server_default="0")
+    active_users = Column(Integer, nullable=False, server_default="0")  # разные пользователи за день
+
+
+class CourseDailyStats(Base):
+    __tablename__ = "course_daily_stats"
+
+    course_id = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    enrollments = Column(Integer, nullable=False, server_default="0")
+    leaves = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        # Сводка по всем курсам за последние дни
+        Index('ix_course_daily_stats_day', 'day'),
+    )
+
+
+# Кто был активен в какой день: новая строка здесь увеличивает active_users
+class UserDailyActivity(Base):
+    __tablename__ = "user_daily_activity"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+
+# До какого seq журнала событий агрегаты уже посчитаны
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    seq = Column(BigInteger, nullable=False, server_default="0")
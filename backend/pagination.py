@@ -0,0 +1,76 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi import Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@dataclass
+class PageParams:
+    """Параметры keyset-пагинации по первичному ключу."""
+    after: Optional[int] = None
+    before: Optional[int] = None
+    limit: int = DEFAULT_PAGE_SIZE
+
+
+@dataclass
+class Page:
+    items: list = field(default_factory=list)
+    next_cursor: Optional[int] = None
+    prev_cursor: Optional[int] = None
+
+
+def page_params(
+    after: Optional[int] = Query(None, description="Вернуть записи с id больше указанного"),
+    before: Optional[int] = Query(None, description="Вернуть записи с id меньше указанного"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+) -> PageParams:
+    """Зависимость FastAPI для параметров пагинации."""
+    return PageParams(after=after, before=before, limit=limit)
+
+
+async def keyset_page(db: AsyncSession, stmt, id_column, params: PageParams) -> Page:
+    """Выполнить запрос постранично: WHERE id > after ORDER BY id LIMIT n + 1.
+
+    Лишняя строка показывает, есть ли следующая страница, без COUNT(*).
+    """
+    if params.before is not None:
+        stmt = stmt.filter(id_column < params.before).order_by(id_column.desc())
+    else:
+        if params.after is not None:
+            stmt = stmt.filter(id_column > params.after)
+        stmt = stmt.order_by(id_column)
+
+    result = await db.execute(stmt.limit(params.limit + 1))
+    rows = list(result.scalars().all())
+    has_more = len(rows) > params.limit
+    rows = rows[:params.limit]
+
+    page = Page(items=rows)
+    if params.before is not None:
+        rows.reverse()
+        if rows:
+            page.next_cursor = rows[-1].id
+            page.prev_cursor = rows[0].id if has_more else None
+    elif rows:
+        page.next_cursor = rows[-1].id if has_more else None
+        page.prev_cursor = rows[0].id if params.after is not None else None
+    return page
+
+
+def page_headers(page: Page) -> dict:
+    """Курсоры соседних страниц для заголовков ответа."""
+    headers = {}
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = str(page.next_cursor)
+    if page.prev_cursor is not None:
+        headers["X-Prev-Cursor"] = str(page.prev_cursor)
+    return headers
+
+
+def apply_page_headers(response: Response, page: Page) -> None:
+    """Передать курсоры соседних страниц в заголовках ответа."""
+    response.headers.update(page_headers(page))
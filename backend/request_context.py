@@ -0,0 +1,17 @@
+import uuid
+
+from fastapi import Request
+
+from log_setup import correlation_id
+
+
+async def request_id_middleware(request: Request, call_next):
+    """id корреляции запроса: берётся из X-Request-ID (его передаёт бот) или создаётся заново."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = correlation_id.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        correlation_id.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
@@ -0,0 +1,31 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import analytics, schemas
+from backend.analytics import MAX_ANALYTICS_DAYS
+from backend.database import get_db
+
+router = APIRouter()
+
+
+# Все ответы читают только дневные агрегаты, а не таблицу enrollments;
+# агрегаты отстают от записей на интервал сборки (ANALYTICS_ROLLUP_INTERVAL)
+@router.get("/summary", response_model=schemas.AnalyticsSummary)
+async def analytics_summary(days: int = Query(7, ge=1, le=MAX_ANALYTICS_DAYS), db: AsyncSession = Depends(get_db)):
+    """Записи, выходы, отток и активные пользователи за последние дни."""
+    return await analytics.get_summary(db, days)
+
+
+@router.get("/daily", response_model=List[schemas.DailyStatsResponse])
+async def daily_stats(days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS), db: AsyncSession = Depends(get_db)):
+    """Показатели по дням."""
+    return await analytics.get_daily_stats(db, days)
+
+
+@router.get("/courses/{course_id}/daily", response_model=List[schemas.CourseDailyStatsResponse])
+async def course_daily_stats(course_id: int, days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS),
+                             db: AsyncSession = Depends(get_db)):
+    """Записи и выходы по дням для курса."""
+    return await analytics.get_course_daily_stats(db, course_id, days)
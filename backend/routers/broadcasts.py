@@ -0,0 +1,49 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import crud, schemas
+from backend.database import get_db
+from backend.pagination import MAX_PAGE_SIZE
+
+router = APIRouter()
+
+
+@router.post("/", response_model=schemas.BroadcastResponse)
+async def create_broadcast(broadcast: schemas.BroadcastCreate, db: AsyncSession = Depends(get_db)):
+    """Создать рассылку студентам курса."""
+    return await crud.create_broadcast(db, broadcast)
+
+
+@router.get("/active", response_model=List[schemas.BroadcastResponse])
+async def list_active_broadcasts(db: AsyncSession = Depends(get_db)):
+    """Незавершённые рассылки."""
+    return await crud.get_active_broadcasts(db)
+
+
+# Получатели рассылки пачками: курсор — последний обработанный users.id
+@router.get("/courses/{course_id}/recipients", response_model=List[schemas.BroadcastRecipient])
+async def list_broadcast_recipients(course_id: int, after: Optional[int] = Query(None),
+                                    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+                                    db: AsyncSession = Depends(get_db)):
+    return await crud.get_broadcast_recipients(db, course_id, after, limit)
+
+
+@router.post("/{broadcast_id}/claim", response_model=schemas.BroadcastResponse)
+async def claim_broadcast(broadcast_id: int, claim: schemas.BroadcastClaim, db: AsyncSession = Depends(get_db)):
+    """Арендовать рассылку для процесса бота; 409, если её выполняет другой процесс или она завершена."""
+    broadcast = await crud.claim_broadcast(db, broadcast_id, claim)
+    if broadcast is None:
+        raise HTTPException(status_code=409, detail="Broadcast is not available")
+    return broadcast
+
+
+@router.patch("/{broadcast_id}", response_model=schemas.BroadcastResponse)
+async def update_broadcast_progress(broadcast_id: int, progress: schemas.BroadcastProgress,
+                                    db: AsyncSession = Depends(get_db)):
+    """Сохранить прогресс рассылки; 409, если аренда перешла к другому процессу."""
+    broadcast = await crud.update_broadcast_progress(db, broadcast_id, progress)
+    if broadcast is None:
+        raise HTTPException(status_code=409, detail="Broadcast is not leased by this runner")
+    return broadcast
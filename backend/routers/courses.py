@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.cache import response_cache, dump_json, course_list_key, course_key
 from backend.database import get_db
+from backend.etag import catalogue_version, make_etag, etag_matches, not_modified, set_validators
+from backend.pagination import PageParams, page_params, page_headers
 from backend.schemas import CourseCreate, CourseResponse
 from backend.crud import create_course, get_courses, get_course_by_id
 
@@ -12,20 +15,41 @@ async def create_new_course(course: CourseCreate, db: AsyncSession = Depends(get
     return await create_course(db, course)
 
 @router.get("/", response_model=list[CourseResponse])
-async def list_courses(db: AsyncSession = Depends(get_db)):
-    return await get_courses(db)
+async def list_courses(request: Request, params: PageParams = Depends(page_params),
+                       db: AsyncSession = Depends(get_db)):
+    # Каталог не менялся — отвечаем 304, не выбирая и не сериализуя курсы
+    version, last_modified = await catalogue_version.get(db)
+    etag = make_etag(version, params.after, params.before, params.limit)
+    if etag_matches(request, etag):
+        return not_modified(etag, last_modified)
+
+    async def build():
+        page = await get_courses(db, params)
+        return dump_json(list[CourseResponse], page.items), page_headers(page)
+
+    response = await response_cache.respond(course_list_key(params.after, params.before, params.limit), build)
+    set_validators(response, etag, last_modified)
+    return response
 
 
 # Получение курса по ID
 @router.get("/{course_id}", response_model=CourseResponse)
-async def get_course(course_id: int, db: AsyncSession = Depends(get_db)):
+async def get_course(course_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """Получить курс по ID."""
-    course = await get_course_by_id(db, course_id)  # Вызовем функцию, которая получит курс по ID
+    version, last_modified = await catalogue_version.get(db)
+    etag = make_etag(version, course_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, last_modified)
 
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
+    async def build():
+        course = await get_course_by_id(db, course_id)  # Вызовем функцию, которая получит курс по ID
 
-    return course
+        if not course:
+            raise HTTPException(status_code=404, detail="Course not found")
 
+        return dump_json(CourseResponse, course), {}
 
+    response = await response_cache.respond(course_key(course_id), build)
+    set_validators(response, etag, last_modified)
+    return response
 
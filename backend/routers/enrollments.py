@@ -3,50 +3,70 @@ from typing import List
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend import crud, schemas
+from backend.cache import response_cache, dump_json, user_courses_key
 from backend.database import get_db
+from backend.pagination import PageParams, page_params, page_headers
 
 router = APIRouter()
 
 
+# Ответ о записи на курс: одинаковый для всех маршрутов записи и выхода
+def _enrollment_dict(enrollment) -> dict:
+    return {
+        "user_id": enrollment.user_id,
+        "course_id": enrollment.course_id,
+        "enrolled_at": enrollment.enrolled_at
+    }
+
+
 # Получение курсов пользователя по Telegram ID
-@router.get("/users/{telegram_id}/courses", response_model=List[schemas.CourseResponse])
-async def get_courses_for_user(telegram_id: int, db: AsyncSession = Depends(get_db)):
+@router.get("/users/{telegram_id}/courses", response_model=List[schemas.UserCourseResponse])
+async def get_courses_for_user(telegram_id: int, params: PageParams = Depends(page_params),
+                               db: AsyncSession = Depends(get_db)):
     user = await crud.get_user_by_telegram_id(db, telegram_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    courses = await crud.get_courses_for_user(db, user.id)
-    return courses
+
+    async def build():
+        page = await crud.get_courses_for_user(db, user.id, params)
+        return dump_json(List[schemas.UserCourseResponse], page.items), page_headers(page)
+
+    return await response_cache.respond(user_courses_key(user.id, params.after, params.before, params.limit), build)
 
 
 # Запись пользователя на курс
 @router.post("/enroll")
 async def enroll_user(enrollment_data: schemas.EnrollmentCreate, db: AsyncSession = Depends(get_db)):
-    existing_enrollment = await crud.get_enrollment_by_user_and_course(
-        db, enrollment_data.user_id, enrollment_data.course_id
-    )
-    if existing_enrollment:
-        raise HTTPException(status_code=400, detail="User already enrolled in this course")
     enrollment = await crud.enroll_user_on_course(db, enrollment_data.course_id, enrollment_data.user_id)
-    costil_dict = {
-        "user_id": enrollment.user_id,
-        "course_id": enrollment.course_id,
-        "enrolled_at": enrollment.enrolled_at
-    }
-    return costil_dict
+    return _enrollment_dict(enrollment)
+
+
+# Пакетная запись пользователей на курсы
+@router.post("/bulk", response_model=List[schemas.BulkEnrollmentResult])
+async def bulk_enroll_users(request: schemas.BulkEnrollmentRequest, db: AsyncSession = Depends(get_db)):
+    """Записать до 10 000 пар (user_id, course_id) одной транзакцией."""
+    return await crud.bulk_enroll(db, request.items)
 
 
 # Удаление записи пользователя с курса
 @router.delete("/leave_enrollment/{user_id}/{course_id}")
 async def remove_enrollment(user_id: int, course_id: int, db: AsyncSession = Depends(get_db)):
-    enrollment = await crud.get_enrollment_by_user_and_course(db, user_id, course_id)
+    enrollment = await crud.remove_enrollment(db, user_id, course_id)
     if not enrollment:
         raise HTTPException(status_code=404, detail="Enrollment not found")
-    enrollment = await crud.remove_enrollment(db, enrollment.id)
+    return _enrollment_dict(enrollment)
+
+
+# Маршруты по Telegram ID: боту не нужно сначала получать внутренний id пользователя
+@router.post("/telegram/{telegram_id}/courses/{course_id}")
+async def enroll_by_telegram_id(telegram_id: int, course_id: int, db: AsyncSession = Depends(get_db)):
+    enrollment = await crud.enroll_user_by_telegram_id(db, course_id, telegram_id)
+    return _enrollment_dict(enrollment)
+
+
+@router.delete("/telegram/{telegram_id}/courses/{course_id}")
+async def leave_by_telegram_id(telegram_id: int, course_id: int, db: AsyncSession = Depends(get_db)):
+    enrollment = await crud.remove_enrollment_by_telegram_id(db, course_id, telegram_id)
     if not enrollment:
-        raise HTTPException(status_code=404, detail="Enrollment could not be removed")
-    costil_dict = {
-        "user_id": enrollment.user_id,
-        "course_id": enrollment.course_id,
-        "enrolled_at": enrollment.enrolled_at
-    }
-    return costil_dict
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+    return _enrollment_dict(enrollment)
@@ -0,0 +1,28 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import events, schemas
+from backend.database import get_db
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter()
+
+
+# Лента событий для потребителей: курсор — seq последнего обработанного события
+@router.get("/", response_model=List[schemas.EnrollmentEventResponse])
+async def list_events(response: Response, after: int = Query(0, ge=0),
+                      limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                      db: AsyncSession = Depends(get_db)):
+    """События записи и выхода с курсов с seq больше after.
+
+    seq выдаётся в порядке фиксации, поэтому новые события всегда получают
+    seq больше уже отданных. X-Next-Cursor — значение after для следующего
+    запроса; пустой ответ значит, что новых событий пока нет. Номера seq
+    выдаёт фоновая задача, поэтому событие попадает в ленту с задержкой до
+    EVENTS_SEQUENCE_INTERVAL.
+    """
+    items = await events.get_events(db, after, limit)
+    response.headers["X-Next-Cursor"] = str(items[-1]["seq"] if items else after)
+    return items
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from backend.export import EXPORTS, EXPORT_FORMATS, stream_export
+
+router = APIRouter()
+
+
+# Выгрузка таблицы целиком: users, courses или enrollments
+@router.get("/{name}")
+async def export_table(name: str, format: str = Query("csv", pattern="^(csv|ndjson)$")):
+    """Потоковая выгрузка в CSV или NDJSON без загрузки таблицы в память."""
+    if name not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    return StreamingResponse(
+        stream_export(name, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
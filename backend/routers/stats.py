@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+
+from backend.cache import response_cache
+from backend.database import engine
+from backend.timing import route_query_stats
+
+router = APIRouter()
+
+
+# Статистика кэша ответов
+@router.get("/cache")
+async def cache_stats():
+    """Попадания и промахи кэша ответов."""
+    return response_cache.stats()
+
+
+# Статистика пула соединений с базой данных
+@router.get("/pool")
+async def pool_stats():
+    """Занятые и свободные соединения, ожидания и таймауты выдачи."""
+    return engine.pool.stats()
+
+
+# Запросы к базе по маршрутам
+@router.get("/queries")
+async def query_stats():
+    """Число запросов к базе, время в базе и самый медленный запрос по каждому маршруту."""
+    return route_query_stats.snapshot()
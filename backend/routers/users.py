@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.schemas import UserCreate, UserResponse
-from backend.crud import create_or_update_user, get_users, get_user_by_telegram_id
+from backend.schemas import UserCreate, UserResponse, BulkUserRequest, BulkUserResult, UserSessionResponse
+from backend.crud import create_or_update_user, get_users, get_user_by_telegram_id, bulk_upsert_users, \
+    get_user_session
 from backend.database import get_db
+from backend.etag import make_etag, etag_matches, not_modified, set_validators
+from backend.pagination import PageParams, page_params, apply_page_headers
 
 router = APIRouter()
 
@@ -12,15 +15,42 @@ async def create_user_endpoint(user: UserCreate, db: AsyncSession = Depends(get_
     return await create_or_update_user(db, user.telegram_id, user.name)
 
 
+@router.post("/bulk", response_model=list[BulkUserResult])
+async def bulk_create_users_endpoint(request: BulkUserRequest, db: AsyncSession = Depends(get_db)):
+    """Импорт до 10 000 пользователей одной транзакцией."""
+    return await bulk_upsert_users(db, request.items)
+
+
 @router.get("/", response_model=list[UserResponse])
-async def list_users(db: AsyncSession = Depends(get_db)):
-    """Получаем список всех пользователей."""
-    return await get_users(db)
+async def list_users(response: Response, params: PageParams = Depends(page_params),
+                     db: AsyncSession = Depends(get_db)):
+    """Получаем страницу пользователей."""
+    page = await get_users(db, params)
+    apply_page_headers(response, page)
+    return page.items
 
 @router.get("/{telegram_id}", response_model=UserResponse)
-async def get_user_by_telegram_id_endpoint(telegram_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user_by_telegram_id_endpoint(telegram_id: int, request: Request, response: Response,
+                                           db: AsyncSession = Depends(get_db)):
     """Получить пользователя по его Telegram ID."""
     user = await get_user_by_telegram_id(db, telegram_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
\ No newline at end of file
+
+    # Пользователь не изменился — отвечаем 304 без сериализации. Last-Modified
+    # не отдаём: имя меняется при повторном /start, а времени изменения у
+    # пользователя нет, только created_at
+    etag = make_etag("user", user.id, user.telegram_id, user.name, user.email)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
+    return user
+
+
+@router.get("/{telegram_id}/session", response_model=UserSessionResponse)
+async def get_user_session_endpoint(telegram_id: int, db: AsyncSession = Depends(get_db)):
+    """Пользователь и id его курсов одним запросом — для сессии бота."""
+    session = await get_user_session(db, telegram_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return session
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from datetime import date, datetime
 from typing import Optional, List
 
 
@@ -7,6 +7,7 @@ from typing import Optional, List
 class CourseBase(BaseModel):
     title: str
     description: Optional[str] = None
+    capacity: Optional[int] = Field(None, ge=1)
 
 
 class CourseCreate(CourseBase):
@@ -14,6 +15,17 @@ class CourseCreate(CourseBase):
 
 
 class CourseResponse(CourseBase):
+    id: int
+    enrolled_count: int = 0
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+# Курс в списке курсов пользователя: без счётчика мест, чтобы запись или выход
+# других пользователей не сбрасывали кэш этого списка
+class UserCourseResponse(CourseBase):
     id: int
     created_at: datetime
 
@@ -37,6 +49,11 @@ class UserResponse(UserBase):
     created_at: datetime
 
 
+# Данные сессии бота: пользователь и id курсов, на которые он записан
+class UserSessionResponse(UserResponse):
+    course_ids: List[int] = []
+
+
 # Модели для записей на курсы
 class EnrollmentCreate(BaseModel):
     user_id: int
@@ -55,6 +72,30 @@ class EnrollmentRequest(BaseModel):
     course_id: int
 
 
+# Модели для пакетных операций
+BULK_MAX_ITEMS = 10000
+
+
+class BulkEnrollmentRequest(BaseModel):
+    items: List[EnrollmentCreate] = Field(..., max_length=BULK_MAX_ITEMS)
+
+
+class BulkEnrollmentResult(BaseModel):
+    user_id: int
+    course_id: int
+    status: str  # created, already_enrolled, duplicate, user_not_found, course_not_found, course_full
+
+
+class BulkUserRequest(BaseModel):
+    items: List[UserCreate] = Field(..., max_length=BULK_MAX_ITEMS)
+
+
+class BulkUserResult(BaseModel):
+    telegram_id: int
+    id: Optional[int] = None
+    status: str  # created, updated, unchanged, duplicate
+
+
 # Дополнительные схемы для улучшений
 class UserWithCoursesResponse(UserResponse):
     courses: List[CourseResponse] = []
@@ -62,3 +103,86 @@ class UserWithCoursesResponse(UserResponse):
 
 class CourseWithEnrollmentsResponse(CourseResponse):
     enrollments: List[EnrollmentResponse] = []
+
+
+# Модели для рассылок
+class BroadcastCreate(BaseModel):
+    course_id: int
+    text: str = Field(..., min_length=1, max_length=4096)
+
+
+# Аренда рассылки процессом бота: owner — его идентификатор
+class BroadcastClaim(BaseModel):
+    owner: str = Field(..., min_length=1, max_length=200)
+    lease_seconds: int = Field(120, ge=1, le=3600)
+
+
+class BroadcastProgress(BroadcastClaim):
+    cursor: Optional[int] = None
+    sent: int
+    failed: int
+    status: str = "running"
+
+
+class BroadcastResponse(BroadcastCreate):
+    id: int
+    status: str
+    cursor: Optional[int] = None
+    sent: int
+    failed: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class BroadcastRecipient(BaseModel):
+    user_id: int
+    telegram_id: int
+
+
+# Модели для аналитики
+class DailyStatsResponse(BaseModel):
+    day: date
+    enrollments: int
+    leaves: int
+    active_users: int
+
+    class Config:
+        orm_mode = True
+
+
+class CourseDailyStatsResponse(BaseModel):
+    day: date
+    enrollments: int
+    leaves: int
+
+    class Config:
+        orm_mode = True
+
+
+class CourseActivity(BaseModel):
+    course_id: int
+    title: str
+    enrollments: int
+    leaves: int
+
+
+class AnalyticsSummary(BaseModel):
+    days: int
+    enrollments: int
+    leaves: int
+    net: int
+    churn_rate: float
+    active_users_today: int
+    peak_active_users: int
+    top_courses: List[CourseActivity]
+
+
+# Модели для журнала событий
+class EnrollmentEventResponse(BaseModel):
+    seq: int
+    id: int
+    kind: str
+    user_id: int
+    telegram_id: int
+    course_id: int
+    created_at: datetime
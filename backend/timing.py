@@ -0,0 +1,70 @@
+import time
+
+from fastapi import Request
+
+from backend.database import QueryStats, current_query_stats
+
+
+class RouteQueryStats:
+    """Запросы к базе и время ответа, накопленные по маршрутам."""
+
+    def __init__(self):
+        self._routes = {}
+
+    def record(self, route: str, stats: QueryStats, elapsed: float) -> None:
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = {
+                "requests": 0, "queries": 0, "db_time": 0.0, "total_time": 0.0,
+                "max_queries": 0, "slowest_query_time": 0.0, "slowest_query": None,
+            }
+        entry["requests"] += 1
+        entry["queries"] += stats.count
+        entry["db_time"] += stats.total_time
+        entry["total_time"] += elapsed
+        entry["max_queries"] = max(entry["max_queries"], stats.count)
+        if stats.slowest_time > entry["slowest_query_time"]:
+            entry["slowest_query_time"] = stats.slowest_time
+            entry["slowest_query"] = stats.slowest_statement
+
+    def snapshot(self) -> dict:
+        """Маршруты по убыванию суммарного времени в базе."""
+        result = {}
+        for route, entry in sorted(self._routes.items(), key=lambda item: -item[1]["db_time"]):
+            result[route] = {
+                **entry,
+                "queries_per_request": entry["queries"] / entry["requests"],
+                "db_time_avg": entry["db_time"] / entry["requests"],
+                "total_time_avg": entry["total_time"] / entry["requests"],
+            }
+        return result
+
+
+route_query_stats = RouteQueryStats()
+
+
+def server_timing(stats: QueryStats, elapsed: float) -> str:
+    return (f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries", '
+            f"db-slowest;dur={stats.slowest_time * 1000:.1f}, app;dur={elapsed * 1000:.1f}")
+
+
+def route_template(request: Request) -> str:
+    """Шаблон маршрута ("GET /users/{telegram_id}"), а не конкретный путь."""
+    route = request.scope.get("route")
+    return f"{request.method} {route.path}" if route is not None else "unmatched"
+
+
+async def query_timing_middleware(request: Request, call_next):
+    """Считает запросы к базе в рамках HTTP-запроса и отдаёт их в заголовке Server-Timing."""
+    stats = QueryStats(label=f"{request.method} {request.url.path}")
+    token = current_query_stats.set(stats)
+    started_at = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_query_stats.reset(token)
+    elapsed = time.perf_counter() - started_at
+
+    route_query_stats.record(route_template(request), stats, elapsed)
+    response.headers["Server-Timing"] = server_timing(stats, elapsed)
+    return response
@@ -0,0 +1,244 @@
+"""Прогон синтетических нажатий через Dispatcher бота.
+
+Бэкенд подменяется локальным aiohttp-сервером с данными в памяти
+(по настоящему HTTP и через пул BackendClient), Telegram — сессией
+aiogram, которая ничего не отправляет. Измеряется время обработки
+каждого обновления по типу callback:
+
+    python -m benchmarks.bot_bench --users 200 --rounds 5 --backend-latency-ms 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+from benchmarks.stats import LatencyRecorder
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot")
+TELEGRAM_ID_OFFSET = 10_000_000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="одновременных пользователей")
+    parser.add_argument("--rounds", type=int, default=5, help="проходов сценария на пользователя")
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--backend-latency-ms", type=float, default=0.0, help="задержка фейкового бэкенда")
+    return parser.parse_args()
+
+
+class FakeBackend:
+    """Минимальная копия API бэкенда, которую использует бот."""
+
+    def __init__(self, courses: int, latency: float):
+        self.latency = latency
+        now = datetime.now(timezone.utc).isoformat()
+        self.courses = {
+            course_id: {"id": course_id, "title": f"Курс {course_id}", "description": "Бенчмарк",
+                        "capacity": None, "enrolled_count": 0, "created_at": now}
+            for course_id in range(1, courses + 1)
+        }
+        self.users = {}
+        self.created_at = now
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._delay])
+        app.router.add_get("/courses/", self.list_courses)
+        app.router.add_get("/courses/{course_id}", self.get_course)
+        app.router.add_post("/users", self.upsert_user)
+        app.router.add_post("/users/", self.upsert_user)
+        app.router.add_get("/users/{telegram_id}/session", self.get_session)
+        app.router.add_get("/enrollments/users/{telegram_id}/courses", self.user_courses)
+        app.router.add_post("/enrollments/telegram/{telegram_id}/courses/{course_id}", self.enroll)
+        app.router.add_delete("/enrollments/telegram/{telegram_id}/courses/{course_id}", self.leave)
+        return app
+
+    @web.middleware
+    async def _delay(self, request, handler):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def _page(self, items: list, request) -> web.Response:
+        limit = int(request.query.get("limit", 50))
+        after = request.query.get("after")
+        if after is not None:
+            items = [item for item in items if item["id"] > int(after)]
+        page, has_more = items[:limit], len(items) > limit
+        headers = {}
+        if has_more:
+            headers["X-Next-Cursor"] = str(page[-1]["id"])
+        if after is not None and page:
+            headers["X-Prev-Cursor"] = str(page[0]["id"])
+        return web.json_response(page, headers=headers)
+
+    async def list_courses(self, request):
+        return self._page(list(self.courses.values()), request)
+
+    async def get_course(self, request):
+        course = self.courses.get(int(request.match_info["course_id"]))
+        if course is None:
+            return web.json_response({"detail": "Course not found"}, status=404)
+        return web.json_response(course)
+
+    def _user(self, telegram_id: int) -> dict:
+        return self.users.setdefault(telegram_id, {
+            "id": telegram_id - TELEGRAM_ID_OFFSET, "telegram_id": telegram_id, "name": "Bench",
+            "email": None, "created_at": self.created_at, "course_ids": set(),
+        })
+
+    def _user_json(self, user: dict) -> dict:
+        return {**user, "course_ids": sorted(user["course_ids"])}
+
+    async def upsert_user(self, request):
+        data = await request.json()
+        user = self._user(int(data["telegram_id"]))
+        user["name"] = data["name"]
+        return web.json_response(self._user_json(user))
+
+    async def get_session(self, request):
+        telegram_id = int(request.match_info["telegram_id"])
+        if telegram_id not in self.users:
+            return web.json_response({"detail": "User not found"}, status=404)
+        return web.json_response(self._user_json(self.users[telegram_id]))
+
+    async def user_courses(self, request):
+        user = self._user(int(request.match_info["telegram_id"]))
+        return self._page([self.courses[course_id] for course_id in sorted(user["course_ids"])], request)
+
+    async def enroll(self, request):
+        user = self._user(int(request.match_info["telegram_id"]))
+        course_id = int(request.match_info["course_id"])
+        if course_id in user["course_ids"]:
+            return web.json_response({"detail": "User already enrolled in this course"}, status=400)
+        user["course_ids"].add(course_id)
+        return web.json_response({"user_id": user["id"], "course_id": course_id, "enrolled_at": self.created_at})
+
+    async def leave(self, request):
+        user = self._user(int(request.match_info["telegram_id"]))
+        course_id = int(request.match_info["course_id"])
+        if course_id not in user["course_ids"]:
+            return web.json_response({"detail": "Enrollment not found"}, status=404)
+        user["course_ids"].discard(course_id)
+        return web.json_response({"message": "Enrollment removed successfully"})
+
+
+def fake_telegram_session():
+    """Сессия aiogram, которая отвечает на любой метод Bot API без сети."""
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import GetMe
+    from aiogram.types import User
+
+    class FakeTelegramSession(BaseSession):
+        def __init__(self):
+            super().__init__()
+            self.calls = Counter()
+
+        async def make_request(self, bot, method, timeout=None):
+            self.calls[type(method).__name__] += 1
+            if isinstance(method, GetMe):
+                return User(id=42, is_bot=True, first_name="Bench", username="bench_bot")
+            return True
+
+        async def stream_content(self, *args, **kwargs):
+            raise NotImplementedError
+            yield b""
+
+        async def close(self):
+            pass
+
+    return FakeTelegramSession()
+
+
+async def run(args) -> None:
+    backend = FakeBackend(args.courses, args.backend_latency_ms / 1000)
+    runner = web.AppRunner(backend.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    # Модули бота читают окружение при импорте и импортируются без пакета
+    os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+    os.environ.setdefault("ADMIN_USER_ID", "1")
+    os.environ["BACKEND_URL"] = f"http://127.0.0.1:{port}"
+    # Синтетические пользователи нажимают без пауз: троттлинг мерит отдельный сценарий, не этот
+    os.environ.setdefault("THROTTLE_RATE", "1000")
+    os.environ.setdefault("THROTTLE_BURST", "1000")
+    os.environ.setdefault("THROTTLE_DEBOUNCE", "0")
+    sys.path.insert(0, BOT_DIR)
+    import bot as bot_module
+    logging.getLogger().setLevel(logging.WARNING)
+    from aiogram.types import Update
+    from http_client import backend_client
+    from metrics import callback_kind
+    import keyboards
+    from callbacks import (CoursesPage, CourseView, CourseInfo, Enroll, Leave,
+                           AVAILABLE_COURSES, MY_COURSES, MAIN_MENU)
+
+    bot = bot_module.bot
+    bot.session = fake_telegram_session()
+    recorder = LatencyRecorder()
+    update_ids = iter(range(1, 10 ** 9))
+
+    def make_update(telegram_id: int, text: str = None, data: str = None) -> Update:
+        chat = {"id": telegram_id, "type": "private"}
+        user = {"id": telegram_id, "is_bot": False, "first_name": "Bench"}
+        message = {"message_id": 1, "date": int(time.time()), "chat": chat, "from": user, "text": text or "menu"}
+        if data is None:
+            payload = {"message": message}
+        else:
+            payload = {"callback_query": {"id": "1", "from": user, "chat_instance": "bench", "data": data,
+                                          "message": message}}
+        return Update.model_validate({"update_id": next(update_ids), **payload}, context={"bot": bot})
+
+    async def feed(kind: str, update: Update) -> None:
+        started_at = time.perf_counter()
+        ok = True
+        try:
+            await bot_module.dp.feed_update(bot, update)
+        except Exception:
+            ok = False
+        recorder.add(kind, time.perf_counter() - started_at, ok=ok)
+
+    async def user_journey(index: int) -> None:
+        telegram_id = TELEGRAM_ID_OFFSET + index + 1
+        for round_ in range(args.rounds):
+            course_id = (index + round_) % args.courses + 1
+            await feed("/start", make_update(telegram_id, text="/start"))
+            for data in (AVAILABLE_COURSES, CoursesPage(forward=True, cursor=min(8, args.courses - 1)).pack(),
+                         CourseView(course_id=course_id).pack(), CourseInfo(course_id=course_id).pack(),
+                         Enroll(course_id=course_id).pack(), MY_COURSES, Leave(course_id=course_id).pack(),
+                         MAIN_MENU):
+                await feed(callback_kind(data), make_update(telegram_id, data=data))
+
+    await backend_client.start()
+    started_at = time.perf_counter()
+    try:
+        await asyncio.gather(*(user_journey(index) for index in range(args.users)))
+    finally:
+        elapsed = time.perf_counter() - started_at
+        await backend_client.close()
+        await runner.cleanup()
+
+    for name in recorder.samples:
+        recorder.elapsed[name] = elapsed
+    recorder.print_report()
+    print(f"Всего: {sum(len(v) for v in recorder.samples.values())} обновлений за {elapsed:.2f} с")
+    print(f"Вызовы Bot API: {dict(bot.session.calls)}")
+    print(f"Пул бэкенда: {backend_client.stats()}")
+    print(f"Кэш клавиатур: {keyboards.stats()}")
+
+
+def main() -> None:
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
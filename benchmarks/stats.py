@@ -0,0 +1,77 @@
+import time
+from collections import defaultdict
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Перцентиль по уже отсортированным значениям (ближайший ранг)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LatencyRecorder:
+    """Задержки и ошибки по именованным операциям."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.elapsed = {}
+        self.extra = defaultdict(dict)
+
+    def add(self, name: str, seconds: float, ok: bool = True) -> None:
+        self.samples[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def timer(self, name: str):
+        return _Timer(self, name)
+
+    def rows(self) -> list:
+        rows = []
+        for name, values in self.samples.items():
+            values = sorted(values)
+            elapsed = self.elapsed.get(name)
+            rows.append({
+                "name": name,
+                "count": len(values),
+                "errors": self.errors[name],
+                "rps": len(values) / elapsed if elapsed else None,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000 if values else 0.0,
+                **self.extra[name],
+            })
+        return rows
+
+    def print_report(self) -> None:
+        rows = self.rows()
+        extra_columns = sorted({key for row in rows for key in self.extra[row["name"]]})
+        header = ["name", "count", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", *extra_columns]
+        print(" ".join(f"{column:>14}" for column in header))
+        for row in rows:
+            print(" ".join(_format(row.get(column)) for column in header))
+
+
+class _Timer:
+    def __init__(self, recorder: LatencyRecorder, name: str):
+        self.recorder = recorder
+        self.name = name
+        self.ok = True
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.add(self.name, time.perf_counter() - self.started_at, ok=self.ok and exc_type is None)
+        return False
+
+
+def _format(value) -> str:
+    if value is None:
+        return f"{'-':>14}"
+    if isinstance(value, float):
+        return f"{value:>14.2f}"
+    return f"{value!s:>14}"
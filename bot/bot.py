@@ -1,21 +1,63 @@
 import asyncio
 import os
+import uvicorn
+from prometheus_client import start_http_server
 from aiogram import Bot, Dispatcher
 from aiogram.client.session import aiohttp
-from aiogram.filters import CommandStart
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, InputFile
-from config import BOT_TOKEN, ADMIN_USER_ID
-from services import fetch_courses, get_course_by_id, get_user_by_telegram_id, create_or_update_user, \
-    fetch_user_courses, create_enrollment, check_existing_enrollment, remove_enrollment
+from aiogram.filters import CommandStart, Command, CommandObject
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InputFile
+from config import BOT_TOKEN, ADMIN_USER_ID, BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, \
+    WEBHOOK_PORT, UPDATE_WORKERS, UPDATE_QUEUE_SIZE, UPDATE_ENQUEUE_TIMEOUT, BROADCAST_GLOBAL_RATE, BROADCAST_CHAT_RATE, \
+    BROADCAST_BATCH_SIZE, BROADCAST_CONCURRENCY, METRICS_PORT, THROTTLE_BACKEND, THROTTLE_RATE, THROTTLE_BURST, \
+    THROTTLE_INFLIGHT_TTL, THROTTLE_DEBOUNCE, THROTTLE_MAX_USERS, BOT_INSTANCE_ID, BROADCAST_LEASE_SECONDS
+from broadcast import BroadcastSender, BroadcastRunner
+from http_client import backend_client
+from callbacks import CallbackRouter, CoursesPage, MyCoursesPage, CourseView, CourseInfo, Enroll, Leave, page_params, \
+    AVAILABLE_COURSES, MY_COURSES, MAIN_MENU, CONTACT_ADMIN, ADMIN_PANEL, ADMIN_REFRESH_COURSES
+from keyboards import main_menu_keyboard, courses_keyboard, course_detail_keyboard, course_info_keyboard, \
+    course_label, ADMIN_PANEL_KEYBOARD
+from log_context import CorrelationMiddleware
+from metrics import MetricsMiddleware
+from throttle import ThrottleMiddleware, create_throttle_store
+from updates import UpdateQueue
+from webhook import create_webhook_app
+from services import fetch_courses, get_course_by_id, create_or_update_user, fetch_user_courses, \
+    create_enrollment, remove_enrollment, invalidate_course_cache, session_store, create_broadcast, ALREADY_ENROLLED, \
+    USER_NOT_FOUND, COURSE_FULL, fetch_analytics_summary
 
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Инициализация бота и диспетчера
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
+dp.update.outer_middleware(CorrelationMiddleware())
+dp.update.outer_middleware(MetricsMiddleware())
+
+# Троттлинг до фильтров и обработчиков: повторные нажатия не доходят до бэкенда
+throttle = ThrottleMiddleware(
+    create_throttle_store(THROTTLE_BACKEND, maxsize=THROTTLE_MAX_USERS),
+    rate=THROTTLE_RATE,
+    burst=THROTTLE_BURST,
+    inflight_ttl=THROTTLE_INFLIGHT_TTL,
+    debounce=THROTTLE_DEBOUNCE,
+)
+dp.callback_query.outer_middleware(throttle)
+dp.message.outer_middleware(throttle)
+
+# Все нажатия проходят через один обработчик с таблицей маршрутов по префиксу
+callbacks = CallbackRouter()
+dp.callback_query.register(callbacks.dispatch)
+
+# Рассылки студентам курсов
+broadcast_runner = BroadcastRunner(
+    BroadcastSender(bot, global_rate=BROADCAST_GLOBAL_RATE, per_chat_rate=BROADCAST_CHAT_RATE),
+    batch_size=BROADCAST_BATCH_SIZE,
+    concurrency=BROADCAST_CONCURRENCY,
+    owner=BOT_INSTANCE_ID,
+    lease_seconds=BROADCAST_LEASE_SECONDS,
+)
 
 
 async def set_bot_photo(chat_id: int):
@@ -33,54 +75,12 @@ async def set_bot_photo(chat_id: int):
 
                 # Устанавливаем фото бота для текущего чата
                 await bot.set_chat_photo(photo=photo_file, chat_id=chat_id)
-                print("Bot avatar updated successfully.")
+                logger.info("Аватар бота обновлён.")
 
                 # Удаляем файл после использования
                 os.remove("avatar.png")
             else:
-                print("Failed to retrieve the image.")
-
-# Основное меню
-def main_menu_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
-    """Главное меню с опцией для администратора."""
-    buttons = [
-        [InlineKeyboardButton(text="Доступные курсы", callback_data="available_courses")],
-        [InlineKeyboardButton(text="Мои курсы", callback_data="my_courses")],
-        [InlineKeyboardButton(text="Связаться с администратором", callback_data="contact_admin")],
-    ]
-    if is_admin:
-        buttons.append([InlineKeyboardButton(text="Админ-панель", callback_data="admin_panel")])
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-
-# Клавиатура для курсов
-def courses_keyboard(courses: list, back_callback: str) -> InlineKeyboardMarkup:
-    """Список курсов с кнопкой Назад."""
-    buttons = [[InlineKeyboardButton(text=course["title"], callback_data=f"course_{course['id']}")] for course in
-               courses]
-    buttons.append([InlineKeyboardButton(text="Назад", callback_data=back_callback)])
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-
-# Клавиатура для конкретного курса
-async def course_detail_keyboard(course_id: int, user_id: int, from_my_courses: bool = False) -> InlineKeyboardMarkup:
-    """Клавиатура для конкретного курса с кнопкой 'Покинуть курс' если пользователь записан на курс."""
-    # Проверяем, записан ли пользователь на курс
-    is_enrolled = await check_existing_enrollment(user_id, course_id)
-
-    keyboard = [
-        [InlineKeyboardButton(text="Информация о курсе", callback_data=f"info_{course_id}")],
-        [InlineKeyboardButton(text="Записаться на курс" if not is_enrolled else "Покинуть курс",
-                              callback_data=f"{'enroll' if not is_enrolled else 'leave'}_{course_id}")]
-    ]
-
-    # Если пришли из меню "Мои курсы", добавляем кнопку "Назад" в главное меню
-    if from_my_courses:
-        keyboard.append([InlineKeyboardButton(text="Назад", callback_data="my_courses")])
-    else:
-        keyboard.append([InlineKeyboardButton(text="Назад", callback_data="available_courses")])
-
-    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+                logger.error("Не удалось загрузить изображение аватара: %s", response.status)
 
 
 # Функция безопасного обновления сообщения
@@ -89,7 +89,13 @@ async def safe_edit_message(callback: CallbackQuery, text: str, reply_markup: In
     try:
         await callback.message.edit_text(text=text, reply_markup=reply_markup)
     except Exception as e:
-        print(f"Error updating message: {e}")
+        logger.warning("Не удалось обновить сообщение: %s", e)
+
+
+# Флаг администратора берётся из сессии пользователя, а не проверяется в каждом обработчике
+async def is_admin_user(telegram_id: int) -> bool:
+    session = await session_store.get(telegram_id)
+    return session is not None and session.is_admin
 
 
 # Обработчик команды /start
@@ -98,16 +104,26 @@ async def command_start_handler(message: Message) -> None:
     """Приветственное сообщение и регистрация/обновление пользователя."""
     telegram_id = message.from_user.id
     name = message.from_user.full_name
-    is_admin = telegram_id == ADMIN_USER_ID
 
-    # Создаем или обновляем пользователя
-    user = await create_or_update_user(telegram_id=telegram_id, name=name)
+    # Пользователь уже в сессии с тем же именем — писать в базу нечего
+    session = await session_store.peek(telegram_id)
+    if session is not None and session.name == name:
+        user = {"name": session.name}
+    else:
+        # Создаем или обновляем пользователя
+        user = await create_or_update_user(telegram_id=telegram_id, name=name)
+        if user and session is not None:
+            session.name = user['name']
+            await session_store.save(session)
+        elif user:
+            # Загружаем сессию сразу, чтобы повторный /start не обращался к бэкенду
+            session = await session_store.get(telegram_id)
 
     if user:
         # Успешная регистрация или обновление
         await message.answer(
             text=f"Привет, {user['name']}! Выберите действие:",
-            reply_markup=main_menu_keyboard(is_admin)
+            reply_markup=main_menu_keyboard(session is not None and session.is_admin)
         )
     else:
         # Ошибка при регистрации
@@ -117,27 +133,40 @@ async def command_start_handler(message: Message) -> None:
 
 
 # Доступные курсы
-@dp.callback_query(lambda c: c.data == "available_courses")
+@callbacks.action(AVAILABLE_COURSES)
 async def show_available_courses(callback: CallbackQuery) -> None:
-    courses = await fetch_courses()  # Теперь вызываем без аргументов
+    page = await fetch_courses()  # Первая страница каталога
+    await safe_edit_message(
+        callback,
+        text="Доступные курсы:",
+        reply_markup=courses_keyboard(page["items"], page=page)
+    )
+
+
+# Листание доступных курсов
+@callbacks.data(CoursesPage)
+async def page_available_courses(callback: CallbackQuery, data: CoursesPage) -> None:
+    page = await fetch_courses(**page_params(data))
     await safe_edit_message(
         callback,
         text="Доступные курсы:",
-        reply_markup=courses_keyboard(courses, back_callback="main_menu")
+        reply_markup=courses_keyboard(page["items"], page=page)
     )
 
 
 # Мои курсы
-@dp.callback_query(lambda c: c.data == "my_courses")
+@callbacks.action(MY_COURSES)
 async def show_my_courses(callback: CallbackQuery) -> None:
     telegram_id = callback.from_user.id  # Получаем Telegram ID пользователя
-    my_courses = await fetch_user_courses(telegram_id)  # Получаем курсы пользователя
+    session = await session_store.get(telegram_id)
+    # Пустой набор курсов в сессии — список можно не запрашивать
+    page = await fetch_user_courses(telegram_id) if session and session.course_ids else {"items": []}
 
-    if my_courses:  # Проверим, что курсы есть
+    if page["items"]:  # Проверим, что курсы есть
         await safe_edit_message(
             callback,
             text="Ваши курсы:",
-            reply_markup=courses_keyboard(my_courses, back_callback="main_menu")
+            reply_markup=courses_keyboard(page["items"], variant="my", page=page)
         )
     else:
         await safe_edit_message(
@@ -147,122 +176,134 @@ async def show_my_courses(callback: CallbackQuery) -> None:
         )
 
 
+# Листание курсов пользователя
+@callbacks.data(MyCoursesPage)
+async def page_my_courses(callback: CallbackQuery, data: MyCoursesPage) -> None:
+    page = await fetch_user_courses(callback.from_user.id, **page_params(data))
+    await safe_edit_message(
+        callback,
+        text="Ваши курсы:",
+        reply_markup=courses_keyboard(page["items"], variant="my", page=page)
+    )
+
+
 # Детали курса
-@dp.callback_query(lambda c: c.data.startswith("course_"))
-async def show_course_details(callback: CallbackQuery) -> None:
-    course_id = int(callback.data.split("_")[1])
-    course = await get_course_by_id(course_id)  # Получаем конкретный курс
+@callbacks.data(CourseView)
+async def show_course_details(callback: CallbackQuery, data: CourseView) -> None:
+    course_id = data.course_id
+    # Курс берётся из кэша каталога, статус записи — из сессии пользователя
+    course = await get_course_by_id(course_id)
 
     if course:
-        # Проверяем, из какого меню пришел запрос (Мои курсы или Доступные курсы)
-        from_my_courses = callback.data.startswith("course_")
+        session = await session_store.get(callback.from_user.id)
+        is_enrolled = session is not None and course_id in session.course_ids
         await safe_edit_message(
             callback,
-            text=f"Курс: {course['title']}",
-            reply_markup=await course_detail_keyboard(course_id, callback.from_user.id, from_my_courses)
+            text=f"Курс: {course_label(course)}",
+            reply_markup=course_detail_keyboard(course_id, is_enrolled, from_my_courses=data.from_my)
         )
     else:
         await callback.answer("Курс не найден.", show_alert=True)
 
 
 # Информация о курсе
-@dp.callback_query(lambda c: c.data.startswith("info_"))
-async def show_course_info(callback: CallbackQuery) -> None:
-    course_id = int(callback.data.split("_")[1])
+@callbacks.data(CourseInfo)
+async def show_course_info(callback: CallbackQuery, data: CourseInfo) -> None:
+    course_id = data.course_id
     course = await get_course_by_id(course_id)
     if course:
         info_text = f"Информация о курсе {course['title']}:\n{course['description']}"
         await safe_edit_message(
             callback,
             text=info_text,
-            reply_markup=InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [InlineKeyboardButton(text="Назад", callback_data=f"course_{course_id}")]
-                ]
-            )
+            reply_markup=course_info_keyboard(course_id, from_my=data.from_my)
         )
     else:
         await callback.answer("Информация недоступна.", show_alert=True)
 
 
-@dp.callback_query(lambda c: c.data.startswith("enroll_"))
-async def enroll_in_course(callback: CallbackQuery):
-    course_id = int(callback.data.split("_")[1])
+@callbacks.data(Enroll)
+async def enroll_in_course(callback: CallbackQuery, data: Enroll):
+    course_id = data.course_id
     user_telegram_id = callback.from_user.id
 
     try:
-        user = await get_user_by_telegram_id(user_telegram_id)
-        if not user:
-            logger.error(f"Пользователь с Telegram ID {user_telegram_id} не найден.")
-            await callback.answer("Пользователь не найден. Зарегистрируйтесь через /start.", show_alert=True)
-            return
-
-        is_enrolled = await check_existing_enrollment(user['id'], course_id)
-        if is_enrolled:
-            logger.info(f"Пользователь с Telegram ID {user_telegram_id} уже записан на курс {course_id}.")
+        session = await session_store.peek(user_telegram_id)
+        if session is not None and course_id in session.course_ids:
             await callback.answer("Вы уже записаны на этот курс.", show_alert=True)
             return
 
-        # Запись на курс
-        enrollment = await create_enrollment(user['id'], course_id)
-        if enrollment:
-            logger.info(f"Пользователь с Telegram ID {user_telegram_id} успешно записан на курс {course_id}.")
+        # Запись на курс: бэкенд сам находит пользователя по Telegram ID
+        enrollment = await create_enrollment(user_telegram_id, course_id)
+        if enrollment.get("detail") == USER_NOT_FOUND:
+            logger.error("Пользователь с Telegram ID %s не найден.", user_telegram_id)
+            await callback.answer("Пользователь не найден. Зарегистрируйтесь через /start.", show_alert=True)
+        elif enrollment.get("detail") == ALREADY_ENROLLED:
+            logger.info("Пользователь с Telegram ID %s уже записан на курс %s.", user_telegram_id, course_id)
+            await session_store.add_course(user_telegram_id, course_id)
+            await callback.answer("Вы уже записаны на этот курс.", show_alert=True)
+        elif enrollment.get("detail") == COURSE_FULL:
+            invalidate_course_cache(course_id)
+            await callback.answer("На курсе не осталось свободных мест.", show_alert=True)
+        elif enrollment.get("status") == "success":
+            logger.info("Пользователь с Telegram ID %s успешно записан на курс %s.", user_telegram_id, course_id)
+            await session_store.add_course(user_telegram_id, course_id)
+            invalidate_course_cache(course_id)
             await callback.answer(f"Вы успешно записались на курс!", show_alert=True)
 
             # Возврат на главное меню
-            is_admin = user_telegram_id == ADMIN_USER_ID
             await callback.message.edit_text(
                 text="Вы вернулись в главное меню.",
-                reply_markup=main_menu_keyboard(is_admin=is_admin)
+                reply_markup=main_menu_keyboard(is_admin=await is_admin_user(user_telegram_id))
             )
         else:
-            logger.error(f"Ошибка при записи пользователя с Telegram ID {user_telegram_id} на курс {course_id}.")
+            logger.error("Ошибка при записи пользователя с Telegram ID %s на курс %s.", user_telegram_id, course_id)
             await callback.answer("Произошла ошибка при записи. Попробуйте позже.", show_alert=True)
 
     except aiohttp.ClientError as e:
-        logger.error(f"Ошибка при подключении к бэкенду: {e}")
+        logger.error("Ошибка при подключении к бэкенду: %s", e)
         await callback.answer("Ошибка соединения с сервером. Попробуйте позже.", show_alert=True)
 
     except Exception as e:
-        logger.error(f"Ошибка при обработке записи пользователя с Telegram ID {user_telegram_id} на курс {course_id}: {str(e)}")
+        logger.error("Ошибка при обработке записи пользователя с Telegram ID %s на курс %s: %s",
+                     user_telegram_id, course_id, e)
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
 
 
 
 
-@dp.callback_query(lambda c: c.data.startswith("leave_"))
-async def leave_course(callback: CallbackQuery):
-    course_id = int(callback.data.split("_")[1])
+@callbacks.data(Leave)
+async def leave_course(callback: CallbackQuery, data: Leave):
+    course_id = data.course_id
     user_telegram_id = callback.from_user.id
 
     try:
-        user = await get_user_by_telegram_id(user_telegram_id)
-        if not user:
-            logger.error(f"Пользователь с Telegram ID {user_telegram_id} не найден.")
-            await callback.answer("Пользователь не найден. Зарегистрируйтесь через /start.", show_alert=True)
-            return
-
-        result = await remove_enrollment(user['id'], course_id)
+        result = await remove_enrollment(user_telegram_id, course_id)
         if result:
-            logger.info(f"Пользователь с Telegram ID {user_telegram_id} покинул курс {course_id}.")
+            logger.info("Пользователь с Telegram ID %s покинул курс %s.", user_telegram_id, course_id)
+            await session_store.remove_course(user_telegram_id, course_id)
+            invalidate_course_cache(course_id)
             await callback.answer(f"Вы покинули курс: {course_id}.", show_alert=True)
-            is_admin = user_telegram_id == ADMIN_USER_ID
             await callback.message.edit_text(
                 text="Вы вернулись в главное меню.",
-                reply_markup=main_menu_keyboard(is_admin=is_admin)
+                reply_markup=main_menu_keyboard(is_admin=await is_admin_user(user_telegram_id))
             )
         else:
-            logger.error(f"Ошибка при удалении записи пользователя с Telegram ID {user_telegram_id} с курса {course_id}.")
+            logger.error("Ошибка при удалении записи пользователя с Telegram ID %s с курса %s.",
+                         user_telegram_id, course_id)
+            # Сессия могла разойтись с бэкендом — загрузим её заново при следующем обращении
+            await session_store.invalidate(user_telegram_id)
             await callback.answer("Произошла ошибка при удалении. Попробуйте позже.", show_alert=True)
 
     except Exception as e:
-        logger.error(f"Ошибка при обработке запроса пользователя с Telegram ID {user_telegram_id} на удаление с курса {course_id}: {str(e)}")
+        logger.error("Ошибка при обработке запроса пользователя с Telegram ID %s на удаление с курса %s: %s",
+                     user_telegram_id, course_id, e)
         await callback.answer(f"Ошибка: {str(e)}", show_alert=True)
 
 
 
 # Связь с администратором
-@dp.callback_query(lambda c: c.data == "contact_admin")
+@callbacks.action(CONTACT_ADMIN)
 async def contact_admin(callback: CallbackQuery) -> None:
     user_name = callback.from_user.full_name
     user_id = callback.from_user.id
@@ -271,39 +312,115 @@ async def contact_admin(callback: CallbackQuery) -> None:
     await callback.message.answer("Ваш запрос отправлен администратору.")
 
 
+# Текст сводки аналитики для админ-панели
+def analytics_summary_text(summary: dict) -> str:
+    lines = [
+        f"За {summary['days']} дн.: записей {summary['enrollments']}, выходов {summary['leaves']} "
+        f"(отток {summary['churn_rate']:.0%})",
+        f"Активных сегодня: {summary['active_users_today']}, максимум за день: {summary['peak_active_users']}",
+    ]
+    if summary["top_courses"]:
+        lines.append("Популярные курсы:")
+        lines.extend(f"• {course['title']}: +{course['enrollments']} / −{course['leaves']}"
+                     for course in summary["top_courses"])
+    return "\n".join(lines)
+
+
 # Админ-панель
-@dp.callback_query(lambda c: c.data == "admin_panel")
+@callbacks.action(ADMIN_PANEL)
 async def admin_panel(callback: CallbackQuery) -> None:
-    if callback.from_user.id != ADMIN_USER_ID:
+    if not await is_admin_user(callback.from_user.id):
         await callback.answer("У вас нет доступа к этому разделу.", show_alert=True)
     else:
+        summary = await fetch_analytics_summary()
         await safe_edit_message(
             callback,
-            text="Добро пожаловать в админ-панель. Функционал будет добавлен позже.",
-            reply_markup=InlineKeyboardMarkup(
-                inline_keyboard=[[InlineKeyboardButton(text="Назад", callback_data="main_menu")]]
-            )
+            text="Добро пожаловать в админ-панель.\n\n"
+                 f"{analytics_summary_text(summary) if summary else 'Статистика недоступна.'}\n\n"
+                 "Рассылка студентам курса: /broadcast <ID курса> <текст>",
+            reply_markup=ADMIN_PANEL_KEYBOARD
         )
 
 
+# Сброс кэша каталога курсов
+@callbacks.action(ADMIN_REFRESH_COURSES)
+async def admin_refresh_courses(callback: CallbackQuery) -> None:
+    if not await is_admin_user(callback.from_user.id):
+        await callback.answer("У вас нет доступа к этому разделу.", show_alert=True)
+        return
+    invalidate_course_cache()
+    await callback.answer("Каталог курсов будет загружен заново.", show_alert=True)
+
+
+# Рассылка студентам курса: /broadcast <ID курса> <текст>
+@dp.message(Command("broadcast"))
+async def broadcast_command(message: Message, command: CommandObject) -> None:
+    if not await is_admin_user(message.from_user.id):
+        await message.answer("У вас нет доступа к этой команде.")
+        return
+    course_id, _, text = (command.args or "").partition(" ")
+    if not course_id.isdigit() or not text.strip():
+        await message.answer("Использование: /broadcast <ID курса> <текст>")
+        return
+
+    broadcast = await create_broadcast(int(course_id), text.strip())
+    if broadcast.get("status") != "success":
+        await message.answer(f"Не удалось создать рассылку: {broadcast.get('detail', 'бэкенд недоступен')}")
+        return
+    broadcast_runner.start(broadcast)
+    await message.answer(f"Рассылка #{broadcast['id']} запущена.")
+
+
 # Обработчик кнопки Назад
-@dp.callback_query(lambda c: c.data == "main_menu")
+@callbacks.action(MAIN_MENU)
 async def back_to_main_menu(callback: CallbackQuery) -> None:
-    is_admin = callback.from_user.id == ADMIN_USER_ID
     await safe_edit_message(
         callback,
         text="Выберите действие:",
-        reply_markup=main_menu_keyboard(is_admin)
+        reply_markup=main_menu_keyboard(await is_admin_user(callback.from_user.id))
+    )
+
+
+# Запуск в режиме webhook: ASGI-приложение и пул обработчиков обновлений
+async def run_webhook() -> None:
+    update_queue = UpdateQueue(bot, dp, workers=UPDATE_WORKERS, maxsize=UPDATE_QUEUE_SIZE)
+    app = create_webhook_app(bot, update_queue, WEBHOOK_PATH, secret=WEBHOOK_SECRET,
+                             enqueue_timeout=UPDATE_ENQUEUE_TIMEOUT)
+    server = uvicorn.Server(uvicorn.Config(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT))
+
+    update_queue.start()
+    await bot.set_webhook(
+        url=f"{WEBHOOK_BASE_URL.rstrip('/')}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET or None,
+        allowed_updates=dp.resolve_used_update_types(),
     )
+    try:
+        await server.serve()
+    finally:
+        await update_queue.stop()
 
 
 # Главная функция
 async def main() -> None:
     """Запуск бота."""
-    await dp.start_polling(bot)
+    if METRICS_PORT:
+        # Метрики отдаются отдельным HTTP-листенером в фоновом потоке
+        start_http_server(METRICS_PORT)
+    await backend_client.start()
+    # Незавершённые рассылки подхватываются при запуске и после истечения чужой аренды
+    broadcast_watcher = asyncio.create_task(broadcast_runner.watch(BROADCAST_LEASE_SECONDS))
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook()
+        else:
+            await dp.start_polling(bot)
+    finally:
+        broadcast_watcher.cancel()
+        await broadcast_runner.stop()
+        await backend_client.close()
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("\nПрограмма завершена пользователем (KeyboardInterrupt).")
+        logger.info("Программа завершена пользователем (KeyboardInterrupt).")
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest,
+                                TelegramNetworkError, TelegramServerError)
+
+from rate_limit import TokenBucket
+from services import fetch_active_broadcasts, fetch_broadcast_recipients, update_broadcast_progress, claim_broadcast
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastSender:
+    """Отправка сообщений с учётом лимитов Telegram.
+
+    Общий токен-бакет ограничивает число сообщений в секунду на бота,
+    бакеты по чатам — частоту сообщений в один чат. На 429 весь поток
+    ставится на паузу на `retry_after` секунд, и сообщение отправляется снова.
+    """
+
+    def __init__(self, bot: Bot, global_rate: float, per_chat_rate: float, max_retries: int = 5,
+                 max_chats: int = 10000):
+        self.bot = bot
+        self.global_bucket = TokenBucket(rate=global_rate, capacity=global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._chat_buckets = OrderedDict()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(rate=self.per_chat_rate, capacity=1)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def send(self, chat_id: int, text: str) -> bool:
+        """Отправить сообщение; False, если доставка невозможна."""
+        for attempt in range(self.max_retries + 1):
+            await self._chat_bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id, text)
+                return True
+            except TelegramRetryAfter as e:
+                logger.warning("Telegram просит подождать %s с (чат %s)", e.retry_after, chat_id)
+                self.global_bucket.pause(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logger.info("Сообщение в чат %s не доставлено: %s", chat_id, e)
+                return False
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.warning("Ошибка Telegram при отправке в чат %s: %s", chat_id, e)
+                await asyncio.sleep(min(2 ** attempt, 30))
+        return False
+
+
+class BroadcastRunner:
+    """Выполняет рассылки пачками и сохраняет прогресс на бэкенде.
+
+    После каждой пачки курсор (последний users.id) записывается в таблицу
+    рассылок, поэтому после перезапуска `resume()` продолжает с места
+    остановки; повторно может уйти не больше одной пачки. Перед запуском
+    рассылка арендуется на бэкенде (`owner`, `lease_seconds`), и сохранение
+    прогресса продлевает аренду: одну рассылку выполняет одна реплика бота.
+    Если прогресс сохранить не удалось, рассылка останавливается — её
+    продолжит процесс, который арендует её после истечения аренды.
+    """
+
+    def __init__(self, sender: BroadcastSender, batch_size: int, concurrency: int, owner: str,
+                 lease_seconds: int = 120, progress_retries: int = 3, retry_delay: float = 1.0):
+        self.sender = sender
+        self.batch_size = batch_size
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.progress_retries = progress_retries
+        self.retry_delay = retry_delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = {}
+        self._stats = {}
+
+    async def resume(self) -> None:
+        """Продолжить незавершённые рассылки, которые не выполняет другой процесс."""
+        for broadcast in await fetch_active_broadcasts() or []:
+            if broadcast["id"] not in self._tasks:
+                logger.info("Продолжение рассылки %s с курсора %s", broadcast["id"], broadcast["cursor"])
+            self.start(broadcast)
+
+    async def watch(self, interval: float) -> None:
+        """Периодически подхватывать рассылки, аренда которых истекла (например, у упавшей реплики)."""
+        while True:
+            try:
+                await self.resume()
+            except Exception:
+                logger.exception("Не удалось получить незавершённые рассылки")
+            await asyncio.sleep(interval)
+
+    def start(self, broadcast: dict) -> None:
+        if broadcast["id"] in self._tasks:
+            return
+        self._tasks[broadcast["id"]] = asyncio.create_task(self._run(broadcast["id"]))
+
+    async def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks = {}
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    async def _send(self, chat_id: int, text: str) -> bool:
+        async with self._semaphore:
+            return await self.sender.send(chat_id, text)
+
+    async def _save_progress(self, broadcast_id: int, **progress) -> bool:
+        """Сохранить прогресс с повторами; False, если не удалось или аренда потеряна."""
+        for attempt in range(self.progress_retries):
+            if attempt:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            if await update_broadcast_progress(broadcast_id, owner=self.owner, lease_seconds=self.lease_seconds,
+                                               **progress):
+                return True
+        logger.error("Рассылка %s: прогресс не сохранён, рассылка остановлена до истечения аренды", broadcast_id)
+        return False
+
+    async def _run(self, broadcast_id: int) -> None:
+        # Прогресс прошлого запуска не должен попасть в статус failed этого
+        self._stats.pop(broadcast_id, None)
+        try:
+            broadcast = await claim_broadcast(broadcast_id, self.owner, self.lease_seconds)
+            if broadcast is None:
+                logger.info("Рассылка %s выполняется другим процессом или завершена", broadcast_id)
+                return
+            await self._deliver(broadcast)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Рассылка %s прервана ошибкой", broadcast_id)
+            progress = self._stats.get(broadcast_id)
+            if progress:
+                await self._save_progress(broadcast_id, cursor=progress["cursor"], sent=progress["sent"],
+                                          failed=progress["failed"], status="failed")
+        finally:
+            self._tasks.pop(broadcast_id, None)
+
+    async def _deliver(self, broadcast: dict) -> None:
+        broadcast_id = broadcast["id"]
+        cursor, sent, failed = broadcast["cursor"], broadcast["sent"], broadcast["failed"]
+        started_at = time.monotonic()
+        delivered_here = 0
+        while True:
+            recipients = await fetch_broadcast_recipients(broadcast["course_id"], after=cursor,
+                                                          limit=self.batch_size)
+            if recipients is None:
+                # Бэкенд недоступен — попробуем ту же пачку позже
+                await asyncio.sleep(5)
+                continue
+            if not recipients:
+                break
+
+            results = await asyncio.gather(
+                *(self._send(recipient["telegram_id"], broadcast["text"]) for recipient in recipients)
+            )
+            delivered = sum(results)
+            sent += delivered
+            failed += len(results) - delivered
+            delivered_here += delivered
+            cursor = recipients[-1]["user_id"]
+
+            elapsed = time.monotonic() - started_at
+            self._stats[broadcast_id] = {
+                "cursor": cursor,
+                "sent": sent,
+                "failed": failed,
+                "messages_per_second": delivered_here / elapsed if elapsed else 0.0,
+            }
+            if not await self._save_progress(broadcast_id, cursor=cursor, sent=sent, failed=failed):
+                return
+            logger.info("Рассылка %s: отправлено %s, ошибок %s, %.1f сообщ./с",
+                        broadcast_id, sent, failed, self._stats[broadcast_id]["messages_per_second"])
+
+        if await self._save_progress(broadcast_id, cursor=cursor, sent=sent, failed=failed, status="done"):
+            logger.info("Рассылка %s завершена: отправлено %s, ошибок %s", broadcast_id, sent, failed)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+# Маркер ответа 304: данные не изменились, можно продлить старую запись
+NOT_MODIFIED = object()
+
+
+class _Entry:
+    __slots__ = ("value", "etag", "expires_at")
+
+    def __init__(self, value, etag, expires_at):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class TTLCache:
+    """Ограниченный по размеру кэш с TTL и вытеснением LRU.
+
+    Параллельные промахи по одному ключу объединяются в один запрос к бэкенду.
+    Просроченные записи не удаляются сразу: их ETag используется для
+    условного запроса, и ответ 304 лишь продлевает запись.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+
+    async def get_or_load(self, key, loader):
+        """Вернуть значение из кэша или загрузить его через `loader(etag)`.
+
+        `loader` возвращает пару (значение, etag); значение NOT_MODIFIED
+        означает, что закэшированные данные актуальны. Значение None не
+        кэшируется (ошибка бэкенда).
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        invalidations = self._invalidations
+        try:
+            value, etag = await loader(entry.etag if entry is not None else None)
+            # Если во время загрузки кэш сбросили, ответ мог устареть: отдаём его, но не сохраняем
+            fresh = invalidations == self._invalidations
+            if value is NOT_MODIFIED and entry is not None:
+                self.revalidations += 1
+                value = entry.value
+                if fresh:
+                    self._store(key, value, etag or entry.etag, changed=False)
+            elif value is not None and value is not NOT_MODIFIED:
+                if fresh:
+                    self._store(key, value, etag, changed=True)
+            else:
+                value = None
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # ошибка уже отдана вызывающему, не логируем её повторно
+            raise
+        finally:
+            del self._pending[key]
+
+    def invalidate(self, key=None) -> None:
+        """Удалить одну запись или весь кэш."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+        self._invalidations += 1
+        self.version += 1
+
+    def invalidate_group(self, name) -> None:
+        """Удалить все записи с ключами вида (name, ...), например страницы списка."""
+        for key in [key for key in self._entries if isinstance(key, tuple) and key and key[0] == name]:
+            del self._entries[key]
+        self._invalidations += 1
+        self.version += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "version": self.version,
+        }
+
+    def _store(self, key, value, etag, changed: bool) -> None:
+        self._entries[key] = _Entry(value, etag, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        if changed:
+            self.version += 1
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
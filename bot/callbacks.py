@@ -0,0 +1,101 @@
+import logging
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+
+logger = logging.getLogger(__name__)
+
+# Кнопки без параметров: callback_data совпадает с ключом маршрута
+AVAILABLE_COURSES = "available_courses"
+MY_COURSES = "my_courses"
+MAIN_MENU = "main_menu"
+CONTACT_ADMIN = "contact_admin"
+ADMIN_PANEL = "admin_panel"
+ADMIN_REFRESH_COURSES = "admin_refresh_courses"
+
+
+# Кнопки с параметрами: "<префикс>:<поле>:<поле>", разбираются и проверяются один раз в CallbackRouter
+class CoursesPage(CallbackData, prefix="courses"):
+    """Листание каталога: forward — вперёд от cursor, иначе назад."""
+    forward: bool
+    cursor: int
+
+
+class MyCoursesPage(CallbackData, prefix="mycourses"):
+    """Листание курсов пользователя."""
+    forward: bool
+    cursor: int
+
+
+class CourseView(CallbackData, prefix="course"):
+    """Карточка курса; from_my — открыта из «Моих курсов»."""
+    course_id: int
+    from_my: bool = False
+
+
+class CourseInfo(CallbackData, prefix="info"):
+    course_id: int
+    from_my: bool = False
+
+
+class Enroll(CallbackData, prefix="enroll"):
+    course_id: int
+
+
+class Leave(CallbackData, prefix="leave"):
+    course_id: int
+
+
+def page_params(page: CallbackData) -> dict:
+    """Параметры запроса страницы по кнопке листания."""
+    return {"after": page.cursor} if page.forward else {"before": page.cursor}
+
+
+class CallbackRouter:
+    """Выбор обработчика нажатия по префиксу callback_data за O(1).
+
+    Вместо цепочки фильтров aiogram, которая проверяется по порядку
+    регистрации, на диспетчере висит один обработчик `dispatch`: префикс
+    ищется в словаре, данные разбираются в типизированный CallbackData и
+    передаются обработчику вторым аргументом.
+    """
+
+    def __init__(self):
+        self._routes = {}
+
+    def action(self, key: str):
+        """Зарегистрировать обработчик кнопки без параметров."""
+        return self._register(key, None)
+
+    def data(self, callback_data: type):
+        """Зарегистрировать обработчик кнопки с параметрами CallbackData."""
+        return self._register(callback_data.__prefix__, callback_data)
+
+    def _register(self, key: str, callback_data):
+        def decorator(handler):
+            if key in self._routes:
+                raise ValueError(f"Обработчик для {key!r} уже зарегистрирован")
+            self._routes[key] = (callback_data, handler)
+            return handler
+        return decorator
+
+    async def dispatch(self, callback: CallbackQuery):
+        data = callback.data or ""
+        prefix = data.split(":", 1)[0]
+        route = self._routes.get(prefix)
+        if route is None:
+            return await self._outdated(callback)
+        callback_data, handler = route
+        if callback_data is None:
+            return await handler(callback)
+        try:
+            parsed = callback_data.unpack(data)
+        except (ValueError, TypeError):
+            return await self._outdated(callback)
+        return await handler(callback, parsed)
+
+    @staticmethod
+    async def _outdated(callback: CallbackQuery) -> None:
+        # Кнопки старых сообщений или подделанные данные
+        logger.info("Неизвестный callback: %r", callback.data)
+        await callback.answer("Меню устарело. Отправьте /start.", show_alert=True)
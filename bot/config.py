@@ -1,12 +1,76 @@
-import logging
 import os
+import socket
 from dotenv import load_dotenv
 
+from log_setup import setup_logging
+
 # Загрузка переменных окружения
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 BACKEND_URL = os.getenv("BACKEND_URL")
 ADMIN_USER_ID = int(os.getenv("ADMIN_USER_ID"))
-# Логгирование
-logging.basicConfig(level=logging.INFO)
\ No newline at end of file
+
+# Пул HTTP-соединений с бэкендом
+BACKEND_POOL_LIMIT = int(os.getenv("BACKEND_POOL_LIMIT", "100"))
+BACKEND_POOL_LIMIT_PER_HOST = int(os.getenv("BACKEND_POOL_LIMIT_PER_HOST", "30"))
+BACKEND_KEEPALIVE_TIMEOUT = float(os.getenv("BACKEND_KEEPALIVE_TIMEOUT", "60"))
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "10"))
+BACKEND_CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", "3"))
+
+# Размер страницы в списках курсов
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "8"))
+
+# Кэш каталога курсов
+COURSE_CACHE_TTL = float(os.getenv("COURSE_CACHE_TTL", "300"))
+COURSE_CACHE_SIZE = int(os.getenv("COURSE_CACHE_SIZE", "256"))
+
+# Сессии пользователей
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "600"))
+SESSION_MAX_SIZE = int(os.getenv("SESSION_MAX_SIZE", "100000"))
+
+# Кэш клавиатур
+KEYBOARD_CACHE_SIZE = int(os.getenv("KEYBOARD_CACHE_SIZE", "1024"))
+
+# Режим работы: polling или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+# Очередь обновлений в режиме webhook
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+UPDATE_ENQUEUE_TIMEOUT = float(os.getenv("UPDATE_ENQUEUE_TIMEOUT", "1"))
+
+# Рассылки: лимиты Telegram — около 30 сообщений в секунду на бота и 1 в секунду в чат
+BROADCAST_GLOBAL_RATE = float(os.getenv("BROADCAST_GLOBAL_RATE", "25"))
+BROADCAST_CHAT_RATE = float(os.getenv("BROADCAST_CHAT_RATE", "1"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "25"))
+# Рассылку выполняет одна реплика бота: она арендует её на BROADCAST_LEASE_SECONDS
+# и продлевает аренду после каждой пачки; BOT_INSTANCE_ID должен различаться у реплик
+BROADCAST_LEASE_SECONDS = int(os.getenv("BROADCAST_LEASE_SECONDS", "120"))
+BOT_INSTANCE_ID = os.getenv("BOT_INSTANCE_ID", f"{socket.gethostname()}:{os.getpid()}")
+
+# Троттлинг: событий в секунду на пользователя, запас бакета, срок метки обрабатываемого нажатия
+THROTTLE_BACKEND = os.getenv("THROTTLE_BACKEND", "memory")
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "3"))
+THROTTLE_BURST = float(os.getenv("THROTTLE_BURST", "6"))
+THROTTLE_INFLIGHT_TTL = float(os.getenv("THROTTLE_INFLIGHT_TTL", "30"))
+# Сколько секунд после обработки нажатия такое же нажатие считается повторным
+THROTTLE_DEBOUNCE = float(os.getenv("THROTTLE_DEBOUNCE", "1"))
+THROTTLE_MAX_USERS = int(os.getenv("THROTTLE_MAX_USERS", "100000"))
+
+# Порт HTTP-листенера с метриками Prometheus (0 — не запускать)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Логгирование: уровень по умолчанию, уровни модулей ("aiogram=WARNING"),
+# формат json/text и доли INFO-записей, которые пишутся ("services=0.1")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+setup_logging(LOG_LEVEL, levels=LOG_LEVELS, fmt=LOG_FORMAT, sample=LOG_SAMPLE)
\ No newline at end of file
@@ -0,0 +1,151 @@
+import logging
+import time
+
+import aiohttp
+
+from config import (BACKEND_URL, BACKEND_POOL_LIMIT, BACKEND_POOL_LIMIT_PER_HOST, BACKEND_KEEPALIVE_TIMEOUT,
+                    BACKEND_TIMEOUT, BACKEND_CONNECT_TIMEOUT)
+from log_setup import correlation_id
+from metrics import BACKEND_LATENCY, BACKEND_ERRORS, endpoint_template
+
+logger = logging.getLogger(__name__)
+
+
+class BackendClient:
+    """Общий HTTP-клиент бэкенда с пулом keep-alive соединений.
+
+    Сессия создаётся один раз в `main()` бота и закрывается при остановке,
+    поэтому обработчики больше не платят за TCP-подключение на каждый запрос.
+    """
+
+    def __init__(self, base_url: str, limit: int, limit_per_host: int, keepalive_timeout: float,
+                 timeout: float, connect_timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self._session = None
+        self._connector = None
+        self._in_flight = 0
+        self._waits = 0
+        self._waiting = 0
+        self._connections_created = 0
+        self._connections_reused = 0
+
+    async def start(self) -> None:
+        """Открыть пул соединений (идемпотентно)."""
+        if self._session is not None and not self._session.closed:
+            return
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        trace_config.on_connection_queued_start.append(self._on_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_queued_end)
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
+        self._connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=self._connector,
+            timeout=self.timeout,
+            trace_configs=[trace_config],
+        )
+        logger.info("Пул соединений с бэкендом открыт: limit=%s, limit_per_host=%s",
+                    self.limit, self.limit_per_host)
+
+    async def close(self) -> None:
+        """Закрыть пул соединений."""
+        if self._session is None or self._session.closed:
+            return
+        logger.info("Закрытие пула соединений с бэкендом: %s", self.stats())
+        await self._session.close()
+        self._session = None
+        self._connector = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("BackendClient не запущен: вызовите start() в main()")
+        return self._session
+
+    def url(self, endpoint: str) -> str:
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    @staticmethod
+    def _with_request_id(kwargs: dict) -> dict:
+        """Передать бэкенду id корреляции текущего обновления."""
+        request_id = correlation_id.get()
+        if request_id != "-":
+            kwargs["headers"] = {"X-Request-ID": request_id, **(kwargs.get("headers") or {})}
+        return kwargs
+
+    def get(self, endpoint: str, **kwargs):
+        return self.session.get(self.url(endpoint), **self._with_request_id(kwargs))
+
+    def post(self, endpoint: str, **kwargs):
+        return self.session.post(self.url(endpoint), **self._with_request_id(kwargs))
+
+    def patch(self, endpoint: str, **kwargs):
+        return self.session.patch(self.url(endpoint), **self._with_request_id(kwargs))
+
+    def delete(self, endpoint: str, **kwargs):
+        return self.session.delete(self.url(endpoint), **self._with_request_id(kwargs))
+
+    def stats(self) -> dict:
+        """Статистика пула: занятые и простаивающие соединения, ожидания свободного слота."""
+        idle = 0
+        if self._connector is not None:
+            # aiohttp не даёт публичного API для простаивающих соединений
+            idle = sum(len(conns) for conns in getattr(self._connector, "_conns", {}).values())
+        return {
+            "in_use": self._in_flight,
+            "idle": idle,
+            "waiting": self._waiting,
+            "waits": self._waits,
+            "connections_created": self._connections_created,
+            "connections_reused": self._connections_reused,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+        }
+
+    async def _on_request_start(self, session, ctx, params) -> None:
+        self._in_flight += 1
+        ctx.started_at = time.perf_counter()
+
+    async def _on_request_end(self, session, ctx, params) -> None:
+        self._in_flight -= 1
+        BACKEND_LATENCY.labels(params.method, endpoint_template(params.url.path), str(params.response.status)) \
+            .observe(time.perf_counter() - ctx.started_at)
+
+    async def _on_request_exception(self, session, ctx, params) -> None:
+        self._in_flight -= 1
+        BACKEND_ERRORS.labels(params.method, endpoint_template(params.url.path)).inc()
+
+    async def _on_queued_start(self, session, ctx, params) -> None:
+        self._waits += 1
+        self._waiting += 1
+
+    async def _on_queued_end(self, session, ctx, params) -> None:
+        self._waiting -= 1
+
+    async def _on_connection_create(self, session, ctx, params) -> None:
+        self._connections_created += 1
+
+    async def _on_connection_reuse(self, session, ctx, params) -> None:
+        self._connections_reused += 1
+
+
+backend_client = BackendClient(
+    BACKEND_URL,
+    limit=BACKEND_POOL_LIMIT,
+    limit_per_host=BACKEND_POOL_LIMIT_PER_HOST,
+    keepalive_timeout=BACKEND_KEEPALIVE_TIMEOUT,
+    timeout=BACKEND_TIMEOUT,
+    connect_timeout=BACKEND_CONNECT_TIMEOUT,
+)
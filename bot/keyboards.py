@@ -0,0 +1,121 @@
+from functools import lru_cache
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from callbacks import CoursesPage, MyCoursesPage, CourseView, CourseInfo, Enroll, Leave, AVAILABLE_COURSES, \
+    MY_COURSES, MAIN_MENU, CONTACT_ADMIN, ADMIN_PANEL, ADMIN_REFRESH_COURSES
+from config import KEYBOARD_CACHE_SIZE
+
+# Все клавиатуры ниже общие для всех обновлений: их нельзя изменять после создания.
+# Ключ кэша клавиатуры списка — содержимое страницы (курсы, курсоры), поэтому
+# изменение каталога само даёт новый ключ и сброс кэша не нужен.
+
+
+def _button(text: str, callback_data: str) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=text, callback_data=callback_data)
+
+
+def _markup(*rows) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[list(row) for row in rows])
+
+
+# Готовые строки кнопок
+_BACK_TO_MENU = (_button("Назад", MAIN_MENU),)
+_BACK_TO_CATALOGUE = (_button("Назад", AVAILABLE_COURSES),)
+_BACK_TO_MY_COURSES = (_button("Назад", MY_COURSES),)
+_MENU_ROWS = (
+    (_button("Доступные курсы", AVAILABLE_COURSES),),
+    (_button("Мои курсы", MY_COURSES),),
+    (_button("Связаться с администратором", CONTACT_ADMIN),),
+)
+
+# Главное меню: всего два варианта
+_MAIN_MENU = _markup(*_MENU_ROWS)
+_ADMIN_MAIN_MENU = _markup(*_MENU_ROWS, (_button("Админ-панель", ADMIN_PANEL),))
+
+ADMIN_PANEL_KEYBOARD = _markup(
+    (_button("Обновить каталог курсов", ADMIN_REFRESH_COURSES),),
+    _BACK_TO_MENU,
+)
+
+# Варианты списков курсов
+_PAGE_DATA = {"catalogue": CoursesPage, "my": MyCoursesPage}
+
+
+# Название курса с заполненностью, например "Python (12/30)"; в списке курсов
+# пользователя счётчика мест нет, там только название
+def course_label(course: dict) -> str:
+    if course.get("capacity") and "enrolled_count" in course:
+        return f"{course['title']} ({course.get('enrolled_count', 0)}/{course['capacity']})"
+    return course["title"]
+
+
+def main_menu_keyboard(is_admin: bool = False) -> InlineKeyboardMarkup:
+    """Главное меню с опцией для администратора."""
+    return _ADMIN_MAIN_MENU if is_admin else _MAIN_MENU
+
+
+# Клавиатура для курсов
+def courses_keyboard(courses: list, variant: str = "catalogue", page: dict = None) -> InlineKeyboardMarkup:
+    """Список курсов с кнопками листания и кнопкой Назад.
+
+    variant — "catalogue" (доступные курсы) или "my" (курсы пользователя).
+    """
+    page = page or {}
+    items = tuple((course["id"], course_label(course)) for course in courses)
+    return _courses_keyboard(variant, items, page.get("prev"), page.get("next"))
+
+
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def _courses_keyboard(variant: str, items: tuple, prev, next_) -> InlineKeyboardMarkup:
+    page_data = _PAGE_DATA[variant]
+    from_my = variant == "my"
+    rows = [(_button(label, CourseView(course_id=course_id, from_my=from_my).pack()),) for course_id, label in items]
+    navigation = []
+    if prev:
+        navigation.append(_button("« Пред.", page_data(forward=False, cursor=prev).pack()))
+    if next_:
+        navigation.append(_button("След. »", page_data(forward=True, cursor=next_).pack()))
+    if navigation:
+        rows.append(navigation)
+    rows.append(_BACK_TO_MENU)
+    return _markup(*rows)
+
+
+# Кнопки отдельного курса
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def _info_row(course_id: int, from_my: bool) -> tuple:
+    return (_button("Информация о курсе", CourseInfo(course_id=course_id, from_my=from_my).pack()),)
+
+
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def _action_row(course_id: int, is_enrolled: bool) -> tuple:
+    if is_enrolled:
+        return (_button("Покинуть курс", Leave(course_id=course_id).pack()),)
+    return (_button("Записаться на курс", Enroll(course_id=course_id).pack()),)
+
+
+# Клавиатура для деталей курса
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def course_detail_keyboard(course_id: int, is_enrolled: bool, from_my_courses: bool = False) -> InlineKeyboardMarkup:
+    """Кнопки курса; Назад ведёт в тот список, из которого курс открыли."""
+    return _markup(
+        _info_row(course_id, from_my_courses),
+        _action_row(course_id, is_enrolled),
+        _BACK_TO_MY_COURSES if from_my_courses else _BACK_TO_CATALOGUE,
+    )
+
+
+# Клавиатура страницы с информацией о курсе
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def course_info_keyboard(course_id: int, from_my: bool = False) -> InlineKeyboardMarkup:
+    return _markup((_button("Назад", CourseView(course_id=course_id, from_my=from_my).pack()),))
+
+
+def stats() -> dict:
+    """Попадания в кэш клавиатур."""
+    return {
+        name: function.cache_info()._asdict()
+        for name, function in (("courses", _courses_keyboard), ("course_detail", course_detail_keyboard),
+                               ("course_info", course_info_keyboard))
+    }
@@ -0,0 +1,15 @@
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from log_setup import correlation_id
+
+
+class CorrelationMiddleware(BaseMiddleware):
+    """id корреляции для логов обработки обновления; уходит на бэкенд в X-Request-ID."""
+
+    async def __call__(self, handler, event: Update, data: dict):
+        token = correlation_id.set(f"upd-{event.update_id}")
+        try:
+            return await handler(event, data)
+        finally:
+            correlation_id.reset(token)
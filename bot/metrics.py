@@ -0,0 +1,72 @@
+import re
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from prometheus_client import Counter, Histogram
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds",
+    "Время обработки обновления по типу",
+    ["kind"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HANDLER_ERRORS = Counter("bot_handler_errors", "Ошибки в обработчиках обновлений", ["kind"])
+BACKEND_LATENCY = Histogram(
+    "bot_backend_request_duration_seconds",
+    "Время запроса к бэкенду",
+    ["method", "endpoint", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+BACKEND_ERRORS = Counter("bot_backend_request_errors", "Запросы к бэкенду, завершившиеся ошибкой соединения",
+                         ["method", "endpoint"])
+UPDATE_LAG = Histogram(
+    "bot_update_lag_seconds",
+    "Задержка от отправки сообщения пользователем до начала обработки",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+UPDATE_QUEUE_WAIT = Histogram(
+    "bot_update_queue_wait_seconds",
+    "Время ожидания обновления в очереди webhook-режима",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+THROTTLED_UPDATES = Counter("bot_throttled_updates", "Нажатия и сообщения, отклонённые троттлингом",
+                            ["reason"])
+
+_ID_SEGMENT = re.compile(r"/\d+")
+
+
+def callback_kind(data: str) -> str:
+    """Тип нажатия без параметров: "course:5:0" -> "course"."""
+    return data.split(":", 1)[0]
+
+
+def update_kind(update: Update) -> str:
+    if update.callback_query is not None:
+        return callback_kind(update.callback_query.data or "")
+    if update.message is not None:
+        text = update.message.text or ""
+        return text.split()[0].split("@")[0] if text.startswith("/") else "message"
+    return update.event_type
+
+
+def endpoint_template(path: str) -> str:
+    """Путь запроса без id, чтобы не плодить метки: /users/42/session -> /users/{id}/session."""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Время обработки и ошибки по типу обновления, задержка доставки сообщений."""
+
+    async def __call__(self, handler, event: Update, data: dict):
+        kind = update_kind(event)
+        if event.message is not None:
+            UPDATE_LAG.observe(max(0.0, time.time() - event.message.date.timestamp()))
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(kind).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(kind).observe(time.perf_counter() - started_at)
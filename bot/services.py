@@ -1,47 +1,141 @@
+import json
 import logging
 import aiohttp
 
-from config import BACKEND_URL
+from cache import TTLCache, NOT_MODIFIED
+from config import PAGE_SIZE, COURSE_CACHE_SIZE, COURSE_CACHE_TTL, ADMIN_USER_ID, SESSION_BACKEND, SESSION_TTL, \
+    SESSION_MAX_SIZE
+from http_client import backend_client
+from sessions import SessionStore, UserSession, create_session_backend
 
 # Инициализация логгера
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Кэш каталога курсов: курсы меняются редко, а запрашиваются на каждое нажатие
+course_cache = TTLCache(maxsize=COURSE_CACHE_SIZE, ttl=COURSE_CACHE_TTL)
+
 
 # Универсальная функция для отправки GET-запросов
 async def fetch_data(endpoint: str):
     """Получение данных с бэкенда."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{BACKEND_URL}/{endpoint}") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"Успешно получены данные с бэкенда: {len(data)} записей.")
-                    return data
-                else:
-                    logger.error(f"Ошибка при получении данных с бэкенда: {response.status}")
-                    return []
+        async with backend_client.get(endpoint) as response:
+            if response.status == 200:
+                data = await response.json()
+                logger.debug("Успешно получены данные с бэкенда: %s записей.", len(data))
+                return data
+            else:
+                logger.error("Ошибка при получении данных с бэкенда: %s", response.status)
+                return []
     except aiohttp.ClientError as e:
-        logger.error(f"Ошибка при подключении к бэкенду: {e}")
+        logger.error("Ошибка при подключении к бэкенду: %s", e)
         return []
 
 
+# Условный GET-запрос: при совпадении ETag бэкенд отвечает 304 без тела
+async def conditional_get(endpoint: str, params: dict = None, etag: str = None):
+    """Получение данных с бэкенда с If-None-Match. Возвращает (статус, данные, заголовки)."""
+    headers = {"If-None-Match": etag} if etag else {}
+    async with backend_client.get(endpoint, params=params, headers=headers) as response:
+        if response.status == 200:
+            return response.status, await response.json(), response.headers
+        if response.status != 304:
+            logger.error("Ошибка при получении данных с бэкенда: %s", response.status)
+        return response.status, None, response.headers
+
+
+def _page_params(after: int = None, before: int = None) -> dict:
+    params = {"limit": PAGE_SIZE}
+    if after is not None:
+        params["after"] = after
+    if before is not None:
+        params["before"] = before
+    return params
+
+
+def _empty_page() -> dict:
+    return {"items": [], "next": None, "prev": None}
+
+
+# Постраничное получение списков (keyset-курсоры в заголовках ответа)
+async def fetch_page(endpoint: str, after: int = None, before: int = None, etag: str = None):
+    """Получение одной страницы списка с бэкенда. Возвращает (страница, etag)."""
+    try:
+        status, items, headers = await conditional_get(endpoint, _page_params(after, before), etag)
+    except aiohttp.ClientError as e:
+        logger.error("Ошибка при подключении к бэкенду: %s", e)
+        return None, None
+    if status == 304:
+        return NOT_MODIFIED, headers.get("ETag")
+    if status != 200:
+        return None, None
+    logger.debug("Успешно получена страница с бэкенда: %s записей.", len(items))
+    page = {"items": items, "next": headers.get("X-Next-Cursor"), "prev": headers.get("X-Prev-Cursor")}
+    return page, headers.get("ETag")
+
+
 # Получение списка курсов
-async def fetch_courses():
-    """Получение списка курсов с бэкенда."""
-    return await fetch_data("courses/")
+async def fetch_courses(after: int = None, before: int = None):
+    """Получение страницы курсов (через кэш каталога)."""
+    page = await course_cache.get_or_load(
+        ("courses", after, before),
+        lambda etag: fetch_page("courses/", after=after, before=before, etag=etag),
+    )
+    return page or _empty_page()
+
+
+async def _load_course(course_id: int, etag: str = None):
+    try:
+        status, course, headers = await conditional_get(f"courses/{course_id}", etag=etag)
+    except aiohttp.ClientError as e:
+        logger.error("Ошибка при подключении к бэкенду: %s", e)
+        return None, None
+    if status == 304:
+        return NOT_MODIFIED, headers.get("ETag")
+    return course, headers.get("ETag")
 
 
 # Получение курса по ID
 async def get_course_by_id(course_id: int):
-    """Получение информации о курсе по ID."""
-    return await fetch_data(f"courses/{course_id}")
+    """Получение информации о курсе по ID (через кэш каталога)."""
+    return await course_cache.get_or_load(("course", course_id), lambda etag: _load_course(course_id, etag))
+
+
+# Явный сброс кэша каталога, например после изменения курсов
+def invalidate_course_cache(course_id: int = None) -> None:
+    """Сбросить кэш одного курса (вместе со страницами каталога) или всего каталога.
+
+    Страницы каталога показывают заполненность курсов, поэтому после записи
+    или выхода они тоже устаревают.
+    """
+    if course_id is None:
+        course_cache.invalidate()
+    else:
+        course_cache.invalidate(("course", course_id))
+        course_cache.invalidate_group("courses")
 
 
-# Получение пользователя по Telegram ID
-async def get_user_by_telegram_id(telegram_id: int):
-    """Получение пользователя по его Telegram ID."""
-    return await fetch_data(f"users/{telegram_id}")
+# Загрузка сессии пользователя: пользователь и id его курсов одним запросом
+async def load_user_session(telegram_id: int):
+    """Получение данных сессии пользователя с бэкенда."""
+    data = await fetch_data(f"users/{telegram_id}/session")
+    if not data:
+        return None
+    return UserSession(
+        telegram_id=data["telegram_id"],
+        user_id=data["id"],
+        name=data["name"],
+        is_admin=data["telegram_id"] == ADMIN_USER_ID,
+        course_ids=set(data["course_ids"]),
+    )
+
+
+# Сессии пользователей: избавляют обработчики от повторных запросов пользователя
+session_store = SessionStore(
+    create_session_backend(SESSION_BACKEND, maxsize=SESSION_MAX_SIZE),
+    ttl=SESSION_TTL,
+    loader=load_user_session,
+)
 
 
 # Создание или обновление пользователя
@@ -52,61 +146,65 @@ async def create_or_update_user(telegram_id: int, name: str):
 
 
 # Получение курсов для пользователя по Telegram ID через записи
-async def fetch_user_courses(telegram_id: int):
-    """Получение курсов для пользователя по Telegram ID через записи на курсы."""
-    try:
-        # Получаем информацию о пользователе
-        user = await get_user_by_telegram_id(telegram_id)
-        if not user:
-            logger.error(f"Пользователь с Telegram ID {telegram_id} не найден.")
-            return []
+async def fetch_user_courses(telegram_id: int, after: int = None, before: int = None):
+    """Получение страницы курсов пользователя по Telegram ID.
 
-        # Получаем курсы пользователя
-        courses = await fetch_data(f"enrollments/users/{telegram_id}/courses")
-        logger.info(f"Получено {len(courses)} курсов для пользователя с Telegram ID {telegram_id}.")
-        return courses
+    Бэкенд сам отвечает 404 для неизвестного пользователя, поэтому отдельный
+    запрос пользователя не нужен.
+    """
+    page, _ = await fetch_page(f"enrollments/users/{telegram_id}/courses", after=after, before=before)
+    page = page or _empty_page()
+    logger.debug("Получено %s курсов для пользователя с Telegram ID %s.", len(page['items']), telegram_id)
+    return page
 
-    except aiohttp.ClientError as e:
-        logger.error(
-            f"Ошибка при подключении к бэкенду для получения курсов пользователя с Telegram ID {telegram_id}: {e}")
-        return []
+
+ALREADY_ENROLLED = "User already enrolled in this course"
+USER_NOT_FOUND = "User not found"
+COURSE_FULL = "Course is full"
 
 
 # Создание записи о записи пользователя на курс
-# Создание записи о записи пользователя на курс
-async def create_enrollment(user_id: int, course_id: int):
-    data = {"user_id": user_id, "course_id": course_id}
-    response = await post_data("enrollments/enroll", data)
+async def create_enrollment(telegram_id: int, course_id: int) -> dict:
+    """Записать пользователя на курс по Telegram ID.
+
+    Возвращает ответ бэкенда: status == "success" при успехе, иначе detail
+    с причиной (ALREADY_ENROLLED, USER_NOT_FOUND и т.д.).
+    """
+    response = await post_data(f"enrollments/telegram/{telegram_id}/courses/{course_id}", {})
 
-    if response.get("detail") == "User already enrolled in this course":
-        logger.info(f"Пользователь с ID {user_id} уже записан на курс {course_id}.")
-        return None  # Пользователь уже записан, возвращаем None
-    logger.info(f" response: {response}")
-    if response.get(
-            "status") == "success":
-        logger.info(f"Успешно записан пользователь с ID {user_id} на курс {course_id}.")
-        return response  # Возвращаем успешный ответ
-    return None  # Ошибка записи
+    if response.get("detail") == ALREADY_ENROLLED:
+        logger.info("Пользователь с Telegram ID %s уже записан на курс %s.", telegram_id, course_id)
+    elif response.get("status") == "success":
+        logger.info("Успешно записан пользователь с Telegram ID %s на курс %s.", telegram_id, course_id)
+    return response
+
+
+def _error_detail(response_text: str):
+    """Достать поле detail из ответа FastAPI с ошибкой."""
+    try:
+        return json.loads(response_text).get("detail")
+    except (ValueError, AttributeError):
+        return None
 
 
 # Универсальная функция для отправки POST-запросов
 async def post_data(endpoint: str, data: dict):
     """Отправка данных на бэкенд."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{BACKEND_URL}/{endpoint}", json=data) as response:
-                logger.info(f"Ответ от сервера: {response.status} для запроса {endpoint} с данными {data}")
-                if response.status == 200 or response.status == 201:
-                    response_data = await response.json()
-                    logger.info(f"Успешно отправлены данные на бэкенд: {response.status}, {response_data}")
-                    response_data["status"] = "success"
-                    return response_data
-                else:
-                    logger.error(f"Ошибка при отправке данных на бэкенд: {response.status}, {await response.text()}")
-                    return {"status": "error"}
+        async with backend_client.post(endpoint, json=data) as response:
+            # Тела запросов и ответов не пишем: они могут содержать персональные данные
+            logger.debug("Ответ от сервера: %s для запроса %s", response.status, endpoint)
+            if response.status == 200 or response.status == 201:
+                response_data = await response.json()
+                response_data["status"] = "success"
+                return response_data
+            else:
+                response_text = await response.text()
+                logger.error("Ошибка при отправке данных на бэкенд: %s, %s", response.status, response_text)
+                return {"status": "error", "detail": _error_detail(response_text)}
 
     except aiohttp.ClientError as e:
-        logger.error(f"Ошибка при подключении к бэкенду: {e}")
+        logger.error("Ошибка при подключении к бэкенду: %s", e)
         return {}
 
 
@@ -114,37 +212,82 @@ async def post_data(endpoint: str, data: dict):
 async def delete_data(endpoint: str):
     """Отправка DELETE-запроса на бэкенд."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(f"{BACKEND_URL}/{endpoint}") as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    response_data["status"] = "success"
-                    return response_data
-                else:
-                    logger.error(f"Ошибка при удалении данных на бэкенде: {response.status}")
-                    return {"status": "error"}
+        async with backend_client.delete(endpoint) as response:
+            if response.status == 200:
+                response_data = await response.json()
+                response_data["status"] = "success"
+                return response_data
+            else:
+                logger.error("Ошибка при удалении данных на бэкенде: %s", response.status)
+                return {"status": "error"}
     except aiohttp.ClientError as e:
-        logger.error(f"Ошибка при подключении к бэкенду для удаления данных: {e}")
+        logger.error("Ошибка при подключении к бэкенду для удаления данных: %s", e)
         return {}
 
 
-async def remove_enrollment(user_id: int, course_id: int):
+async def remove_enrollment(telegram_id: int, course_id: int):
     try:
-        response = await delete_data(f"enrollments/leave_enrollment/{user_id}/{course_id}")
-        logger.info(f"Ответ от сервера: {response} для запроса {user_id}/{course_id}")
+        response = await delete_data(f"enrollments/telegram/{telegram_id}/courses/{course_id}")
+        logger.debug("Ответ от сервера: %s для запроса %s/%s", response.get("status"), telegram_id, course_id)
         return response.get("status") == "success"
 
     except Exception as e:
-        logger.error(f"Ошибка при удалении записи: {str(e)}")
+        logger.error("Ошибка при удалении записи: %s", e)
         return False
 
 
-# Проверка существующей записи на курс
-async def check_existing_enrollment(user_id: int, course_id: int) -> bool:
-    """Проверить, записан ли пользователь на курс."""
-    courses = await fetch_user_courses(user_id)
-    for course in courses:
-        if course['id'] == course_id:
-            logger.info(f"Пользователь с ID {user_id} уже записан на курс с ID {course_id}.")
-            return True
-    return False
+# Универсальная функция для отправки PATCH-запросов
+async def patch_data(endpoint: str, data: dict):
+    """Частичное обновление данных на бэкенде."""
+    try:
+        async with backend_client.patch(endpoint, json=data) as response:
+            if response.status == 200:
+                return await response.json()
+            logger.error("Ошибка при обновлении данных на бэкенде: %s, %s", response.status, await response.text())
+            return None
+    except aiohttp.ClientError as e:
+        logger.error("Ошибка при подключении к бэкенду: %s", e)
+        return None
+
+
+# Рассылки студентам курса
+async def create_broadcast(course_id: int, text: str) -> dict:
+    return await post_data("broadcasts/", {"course_id": course_id, "text": text})
+
+
+async def fetch_active_broadcasts():
+    return await fetch_data("broadcasts/active")
+
+
+async def fetch_broadcast_recipients(course_id: int, after: int = None, limit: int = 100):
+    """Следующая пачка получателей; None, если бэкенд не ответил (в отличие от пустого списка)."""
+    params = {"limit": limit}
+    if after is not None:
+        params["after"] = after
+    try:
+        status, data, _ = await conditional_get(f"broadcasts/courses/{course_id}/recipients", params=params)
+    except aiohttp.ClientError as e:
+        logger.error("Ошибка при подключении к бэкенду: %s", e)
+        return None
+    return data if status == 200 else None
+
+
+async def claim_broadcast(broadcast_id: int, owner: str, lease_seconds: int):
+    """Арендовать рассылку; None, если её выполняет другой процесс или бэкенд недоступен."""
+    broadcast = await post_data(f"broadcasts/{broadcast_id}/claim", {"owner": owner, "lease_seconds": lease_seconds})
+    return broadcast if broadcast.get("status") == "success" else None
+
+
+async def update_broadcast_progress(broadcast_id: int, owner: str, lease_seconds: int, cursor: int, sent: int,
+                                    failed: int, status: str = "running"):
+    """Сохранить прогресс и продлить аренду; None, если прогресс не сохранён."""
+    return await patch_data(f"broadcasts/{broadcast_id}",
+                            {"owner": owner, "lease_seconds": lease_seconds, "cursor": cursor, "sent": sent,
+                             "failed": failed, "status": status})
+
+
+# Сводка аналитики для админ-панели
+async def fetch_analytics_summary(days: int = 7):
+    """Записи, выходы и активность за последние дни; None, если бэкенд недоступен."""
+    summary = await fetch_data(f"analytics/summary?days={days}")
+    return summary or None
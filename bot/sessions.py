@@ -0,0 +1,139 @@
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+
+@dataclass
+class UserSession:
+    """То, что боту нужно знать о пользователе между нажатиями."""
+    telegram_id: int
+    user_id: int
+    name: str
+    is_admin: bool = False
+    course_ids: set = field(default_factory=set)
+
+    def dumps(self) -> str:
+        data = {**self.__dict__, "course_ids": sorted(self.course_ids)}
+        return json.dumps(data)
+
+    @classmethod
+    def loads(cls, raw: str) -> "UserSession":
+        # Поля, которых нет в этой версии сессии, в старых записях пропускаем
+        data = {key: value for key, value in json.loads(raw).items() if key in cls.__dataclass_fields__}
+        data["course_ids"] = set(data["course_ids"])
+        return cls(**data)
+
+
+class SessionBackend:
+    """Хранилище сессий: строки с TTL по ключу.
+
+    Повторяет команды Redis GET / SET EX / DEL, поэтому несколько реплик бота
+    могут делить сессии через локальный Redis-совместимый сервер.
+    """
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class MemorySessionBackend(SessionBackend):
+    """Сессии в памяти процесса; просроченные записи вычищаются при записи."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        if len(self._entries) >= self.maxsize and key not in self._entries:
+            self._purge()
+        self._entries[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        # Если всё ещё полно — выбрасываем самые старые записи
+        while len(self._entries) >= self.maxsize:
+            del self._entries[next(iter(self._entries))]
+
+
+def create_session_backend(name: str, maxsize: int) -> SessionBackend:
+    if name == "memory":
+        return MemorySessionBackend(maxsize=maxsize)
+    raise ValueError(f"Неизвестное хранилище сессий: {name}")
+
+
+class SessionStore:
+    """Сессии пользователей по telegram_id с TTL.
+
+    При промахе сессия загружается через `loader` одним запросом к бэкенду;
+    запись и выход с курса обновляют набор курсов на месте.
+    """
+
+    def __init__(self, backend: SessionBackend, ttl: float,
+                 loader: Callable[[int], Awaitable[Optional[UserSession]]]):
+        self.backend = backend
+        self.ttl = ttl
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(telegram_id: int) -> str:
+        return f"session:{telegram_id}"
+
+    async def peek(self, telegram_id: int) -> Optional[UserSession]:
+        """Сессия из хранилища без обращения к бэкенду."""
+        raw = await self.backend.get(self._key(telegram_id))
+        return UserSession.loads(raw) if raw is not None else None
+
+    async def get(self, telegram_id: int) -> Optional[UserSession]:
+        session = await self.peek(telegram_id)
+        if session is not None:
+            self.hits += 1
+            return session
+        self.misses += 1
+        session = await self.loader(telegram_id)
+        if session is not None:
+            await self.save(session)
+        return session
+
+    async def save(self, session: UserSession) -> None:
+        await self.backend.set(self._key(session.telegram_id), session.dumps(), self.ttl)
+
+    async def invalidate(self, telegram_id: int) -> None:
+        await self.backend.delete(self._key(telegram_id))
+
+    async def add_course(self, telegram_id: int, course_id: int) -> None:
+        session = await self.peek(telegram_id)
+        if session is not None:
+            session.course_ids.add(course_id)
+            await self.save(session)
+
+    async def remove_course(self, telegram_id: int, course_id: int) -> None:
+        session = await self.peek(telegram_id)
+        if session is not None:
+            session.course_ids.discard(course_id)
+            await self.save(session)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
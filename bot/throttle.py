@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message
+
+from metrics import THROTTLED_UPDATES
+from rate_limit import TokenBucket
+
+
+class ThrottleStore:
+    """Состояние троттлинга: метки обрабатываемых нажатий и токен-бакеты пользователей.
+
+    `acquire`/`expire` повторяют Redis SET NX EX / EXPIRE, поэтому несколько
+    реплик бота могут делить состояние через Redis-совместимый сервер.
+    """
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    async def expire(self, key: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def take_token(self, key: str, rate: float, capacity: float) -> bool:
+        raise NotImplementedError
+
+
+class MemoryThrottleStore(ThrottleStore):
+    """Состояние в памяти процесса; бакеты самых давних пользователей вытесняются."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._locks = {}
+        self._buckets = OrderedDict()
+
+    async def acquire(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        expires_at = self._locks.get(key)
+        if expires_at is not None and expires_at > now:
+            return False
+        self._locks[key] = now + ttl
+        return True
+
+    async def expire(self, key: str, ttl: float) -> None:
+        if key in self._locks:
+            self._locks[key] = time.monotonic() + ttl
+        # Истёкшие метки удаляются при записи, чтобы словарь не рос без предела
+        if len(self._locks) > self.maxsize:
+            now = time.monotonic()
+            for stale in [stale for stale, expires_at in self._locks.items() if expires_at <= now]:
+                del self._locks[stale]
+
+    async def take_token(self, key: str, rate: float, capacity: float) -> bool:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate=rate, capacity=capacity)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire()
+
+
+def create_throttle_store(name: str, maxsize: int) -> ThrottleStore:
+    if name == "memory":
+        return MemoryThrottleStore(maxsize=maxsize)
+    raise ValueError(f"Неизвестное хранилище троттлинга: {name}")
+
+
+class ThrottleMiddleware(BaseMiddleware):
+    """Ограничение частоты нажатий и склейка повторных нажатий одной кнопки.
+
+    Пока нажатие (пользователь, callback_data) обрабатывается и ещё `debounce`
+    секунд после этого, такие же нажатия сразу получают пустой ответ и не
+    доходят до обработчика. Окно после обработки нужно в режиме веб-хука:
+    очередь обновлений выполняет нажатия одного чата по порядку, и повторное
+    нажатие доходит сюда только после завершения первого. Сверх того каждый
+    пользователь ограничен токен-бакетом: `rate` событий в секунду с запасом `burst`.
+    """
+
+    def __init__(self, store: ThrottleStore, rate: float, burst: float, inflight_ttl: float,
+                 debounce: float = 1.0):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.inflight_ttl = inflight_ttl
+        self.debounce = debounce
+
+    async def __call__(self, handler, event, data: dict):
+        user = getattr(event, "from_user", None)
+        if user is None:
+            return await handler(event, data)
+
+        if not await self.store.take_token(f"rate:{user.id}", self.rate, self.burst):
+            THROTTLED_UPDATES.labels("rate").inc()
+            await self._reject(event, "Слишком много нажатий, подождите немного.")
+            return None
+
+        if not isinstance(event, CallbackQuery):
+            return await handler(event, data)
+
+        key = f"inflight:{user.id}:{event.data}"
+        if not await self.store.acquire(key, self.inflight_ttl):
+            THROTTLED_UPDATES.labels("duplicate").inc()
+            await event.answer()
+            return None
+        try:
+            return await handler(event, data)
+        finally:
+            await self.store.expire(key, self.debounce)
+
+    @staticmethod
+    async def _reject(event, text: str) -> None:
+        # CallbackQuery.answer показывает всплывающее уведомление, Message.answer — сообщение
+        if isinstance(event, (CallbackQuery, Message)):
+            await event.answer(text)
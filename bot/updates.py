@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from metrics import UPDATE_QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+def ordering_key(update: Update) -> int:
+    """Ключ упорядочивания: чат обновления, иначе пользователь, иначе update_id."""
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else update.update_id
+
+
+class UpdateQueue:
+    """Ограниченная очередь входящих обновлений с пулом обработчиков.
+
+    Очередь разбита на шарды по числу обработчиков, и обновления одного чата
+    всегда попадают в один шард, поэтому обрабатываются строго по порядку.
+    Переполненный шард не принимает новые обновления (`submit` возвращает
+    False), и веб-хук отвечает Telegram ошибкой, чтобы тот повторил доставку позже.
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, workers: int, maxsize: int):
+        self.bot = bot
+        self.dp = dp
+        shard_size = max(1, maxsize // workers)
+        self._queues = [asyncio.Queue(maxsize=shard_size) for _ in range(workers)]
+        self._tasks = []
+        self.received = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.handler_time_total = 0.0
+        self.handler_time_max = 0.0
+        self.queue_wait_max = 0.0
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        logger.info("Запущено обработчиков обновлений: %s", len(self._tasks))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дождаться обработки принятых обновлений и остановить обработчики."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Не все обновления обработаны до остановки: %s", self.depth())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, update: Update, timeout: float) -> bool:
+        """Поставить обновление в очередь; False, если шард не освободился за `timeout`."""
+        self.received += 1
+        queue = self._queues[ordering_key(update) % len(self._queues)]
+        try:
+            await asyncio.wait_for(queue.put((update, time.monotonic())), timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        return True
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._queues),
+            "depth": self.depth(),
+            "shard_depths": [queue.qsize() for queue in self._queues],
+            "received": self.received,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "handler_time_avg": self.handler_time_total / self.processed if self.processed else 0.0,
+            "handler_time_max": self.handler_time_max,
+            "queue_wait_max": self.queue_wait_max,
+        }
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            update, enqueued_at = await queue.get()
+            started_at = time.monotonic()
+            self.queue_wait_max = max(self.queue_wait_max, started_at - enqueued_at)
+            UPDATE_QUEUE_WAIT.observe(started_at - enqueued_at)
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                self.failed += 1
+                logger.exception("Ошибка при обработке обновления %s", update.update_id)
+            finally:
+                elapsed = time.monotonic() - started_at
+                self.processed += 1
+                self.handler_time_total += elapsed
+                self.handler_time_max = max(self.handler_time_max, elapsed)
+                queue.task_done()
@@ -0,0 +1,50 @@
+import hmac
+
+from aiogram import Bot
+from aiogram.types import Update
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from updates import UpdateQueue
+
+# Адреса, с которых /stats доступен без секрета, если он не задан
+_LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def create_webhook_app(bot: Bot, update_queue: UpdateQueue, path: str, secret: str = None,
+                       enqueue_timeout: float = 1.0) -> FastAPI:
+    """ASGI-приложение, принимающее обновления Telegram в очередь обработки.
+
+    Обновление только проверяется и ставится в очередь, ответ Telegram уходит
+    сразу; обработка идёт в пуле `UpdateQueue`.
+    """
+    app = FastAPI()
+
+    def check_secret(request: Request) -> None:
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(token, secret):
+            raise HTTPException(status_code=403, detail="Invalid secret token")
+
+    @app.post(path)
+    async def telegram_webhook(request: Request):
+        if secret:
+            check_secret(request)
+
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+        if not await update_queue.submit(update, timeout=enqueue_timeout):
+            # Очередь переполнена: Telegram повторит доставку позже
+            return Response(status_code=503)
+        return Response(status_code=200)
+
+    @app.get("/stats")
+    async def update_queue_stats(request: Request):
+        """Глубина очереди и время обработки обновлений.
+
+        Нужен тот же секрет, что и для обновлений; без секрета — только с localhost.
+        """
+        if secret:
+            check_secret(request)
+        elif not request.client or request.client.host not in _LOCAL_HOSTS:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        return update_queue.stats()
+
+    return app
@@ -1,9 +1,44 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
-    SSL_CERT_PATH: str
+    # Корневой сертификат для SSL-подключения к базе; без него SSL не настраивается
+    SSL_CERT_PATH: Optional[str] = None
+
+    # Настройки подключения к базе данных
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Размер кэша подготовленных выражений asyncpg (0 — выключить, нужно за pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Запросы дольше порога (мс) пишутся в лог без значений параметров; 0 — не писать
+    DB_SLOW_QUERY_MS: float = 200.0
+
+    # Сколько секунд можно доверять запомненной версии каталога для ETag
+    ETAG_VERSION_TTL: float = 5.0
+
+    # Кэш готовых ответов горячих маршрутов чтения
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_TTL: float = 60.0
+    RESPONSE_CACHE_SIZE: int = 1024
+
+    # Как часто (сек) событиям журнала выдаются номера seq — задержка ленты GET /events
+    EVENTS_SEQUENCE_INTERVAL: float = 1.0
+    # Как часто (сек) новые события журнала переносятся в агрегаты аналитики; 0 — не переносить
+    ANALYTICS_ROLLUP_INTERVAL: float = 30.0
+
+    # Логирование: уровень по умолчанию, уровни модулей ("sqlalchemy.engine=WARNING"),
+    # формат json/text и доли INFO-записей, которые пишутся ("backend.database=0.1")
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_FORMAT: str = "json"
+    LOG_SAMPLE: str = ""
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,149 @@
+"""Общая настройка логирования для бэкенда и бота.
+
+Записи уходят в очередь (QueueHandler), а в поток вывода их пишет отдельный
+поток QueueListener, поэтому вызов logger.info не блокирует event loop.
+Формат — JSON-строка на запись с id корреляции текущего HTTP-запроса или
+обновления Telegram.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# id корреляции: X-Request-ID на бэкенде, id обновления в боте
+correlation_id: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+# Атрибуты LogRecord, которые не считаются дополнительными полями (extra=...)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class CorrelationFilter(logging.Filter):
+    """Добавляет к записи id корреляции в момент вызова, пока контекст ещё доступен."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает каждую N-ю запись уровня INFO и ниже от заданных логгеров.
+
+    Правила — доли вида {"services": 0.1}; правило логгера действует и на его
+    дочерние логгеры. Предупреждения и ошибки проходят всегда.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self._counters = {}
+
+    def _rate(self, name: str):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        # Отдельный счётчик на каждое место вызова, чтобы редкие строки не терялись за частыми
+        key = (record.name, record.msg)
+        count = self._counters.get(key, 0)
+        self._counters[key] = count + 1
+        return count % round(1 / rate) == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Собирает текст сообщения в вызывающем потоке, остальное форматирует поток записи."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной JSON-строкой."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+        }
+        data.update({key: value for key, value in vars(record).items()
+                     if key not in _RECORD_ATTRS and key != "correlation_id"})
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def parse_mapping(value: str, cast=str) -> dict:
+    """Разобрать строку вида "services=0.1,sqlalchemy.engine=WARNING"."""
+    result = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, setting = item.partition("=")
+        result[name.strip()] = cast(setting.strip())
+    return result
+
+
+def setup_logging(level: str = "INFO", levels: str = "", fmt: str = "json", sample: str = "") -> None:
+    """Настроить корневой логгер: очередь, JSON-формат, уровни по модулям и выборку.
+
+    level — уровень по умолчанию; levels — уровни отдельных логгеров
+    ("aiogram=WARNING,services=DEBUG"); fmt — "json" или "text";
+    sample — доли пропускаемых INFO-записей ("services=0.1").
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s")
+        )
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+    queue_handler.addFilter(SamplingFilter(parse_mapping(sample, float)))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level.upper())
+    for name, logger_level in parse_mapping(levels).items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    """Дописать оставшиеся в очереди записи при выходе."""
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerCallbackQuery
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули бота читают окружение при импорте и импортируются без пакета
+os.environ.setdefault("BOT_TOKEN", "42:TEST")
+os.environ.setdefault("ADMIN_USER_ID", "1")
+os.environ.setdefault("BACKEND_URL", "http://127.0.0.1:9")
+os.environ.setdefault("LOG_FORMAT", "text")
+# Как при запуске бота: сначала каталог bot/, затем корень репозитория (log_setup)
+sys.path[:0] = [os.path.join(ROOT_DIR, "bot"), ROOT_DIR]
+
+
+class FakeBotAPI(BaseSession):
+    """Сессия aiogram, которая отвечает как Bot API, но без сети.
+
+    Ответы проходят через BaseSession.check_response, поэтому ошибки
+    превращаются в те же исключения aiogram, что и у настоящего API:
+    чаты из `blocked` получают 403, чат из `retry_after` — 429 с
+    parameters.retry_after нужное число раз. Ответы на нажатия кнопок
+    записываются в `answered`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.blocked = set()
+        self.retry_after = {}  # chat_id -> [секунды, сколько раз ответить 429]
+        self.calls = Counter()
+        self.delivered = []  # (chat_id, text, time.monotonic())
+        self.answered = []  # (callback_query_id, text)
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, AnswerCallbackQuery):
+            self.answered.append((method.callback_query_id, method.text))
+            return self.check_response(bot, method, 200, json.dumps({"ok": True, "result": True})).result
+        chat_id = method.chat_id
+        self.calls[chat_id] += 1
+        if chat_id in self.blocked:
+            status, payload = 403, {"ok": False, "error_code": 403,
+                                    "description": "Forbidden: bot was blocked by the user"}
+        elif self.retry_after.get(chat_id, [0, 0])[1] > 0:
+            seconds, _ = self.retry_after[chat_id]
+            self.retry_after[chat_id][1] -= 1
+            status, payload = 429, {"ok": False, "error_code": 429,
+                                    "description": f"Too Many Requests: retry after {seconds}",
+                                    "parameters": {"retry_after": seconds}}
+        else:
+            self.delivered.append((chat_id, method.text, time.monotonic()))
+            status, payload = 200, {"ok": True, "result": {
+                "message_id": len(self.delivered), "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "text": method.text,
+            }}
+        return self.check_response(bot, method, status, json.dumps(payload)).result
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+        yield b""
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def telegram():
+    return FakeBotAPI()
+
+
+@pytest.fixture
+def bot(telegram):
+    return Bot(token="42:TEST", session=telegram)
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+
+import broadcast
+from broadcast import BroadcastRunner, BroadcastSender
+
+
+class FakeBroadcastBackend:
+    """Таблица рассылок и студенты курса с telegram_id == users.id."""
+
+    def __init__(self, user_ids, broadcast_row):
+        self.user_ids = sorted(user_ids)
+        self.broadcast = {"owner": None, **broadcast_row}
+        self.lease_expired = False
+        self.progress_updates = 0
+        self.hang_after_update = None  # номер обновления, после которого "процесс падает"
+        self.crashed = asyncio.Event()
+        self.failing_updates = 0  # сколько следующих сохранений прогресса "не дойдут" до бэкенда
+        self.fail_recipients_after = None  # курсор, после которого запрос получателей падает
+
+    async def fetch_active_broadcasts(self):
+        return [dict(self.broadcast)] if self.broadcast["status"] == "running" else []
+
+    async def claim_broadcast(self, broadcast_id, owner, lease_seconds):
+        if self.broadcast["status"] != "running":
+            return None
+        if self.broadcast["owner"] not in (None, owner) and not self.lease_expired:
+            return None
+        self.broadcast["owner"] = owner
+        self.lease_expired = False
+        return dict(self.broadcast)
+
+    async def fetch_broadcast_recipients(self, course_id, after, limit):
+        if self.fail_recipients_after is not None and after == self.fail_recipients_after:
+            raise RuntimeError("unexpected backend response")
+        ids = [user_id for user_id in self.user_ids if after is None or user_id > after][:limit]
+        return [{"user_id": user_id, "telegram_id": user_id} for user_id in ids]
+
+    async def update_broadcast_progress(self, broadcast_id, owner, lease_seconds, cursor, sent, failed,
+                                        status="running"):
+        if self.failing_updates:
+            self.failing_updates -= 1
+            return None
+        if owner != self.broadcast["owner"]:
+            return None
+        self.broadcast.update(cursor=cursor, sent=sent, failed=failed, status=status)
+        self.progress_updates += 1
+        if self.progress_updates == self.hang_after_update:
+            self.crashed.set()
+            await asyncio.Event().wait()
+        return dict(self.broadcast)
+
+    def install(self, monkeypatch):
+        for name in ("fetch_active_broadcasts", "claim_broadcast", "fetch_broadcast_recipients",
+                     "update_broadcast_progress"):
+            monkeypatch.setattr(broadcast, name, getattr(self, name))
+
+
+def make_broadcast(**fields):
+    return {"id": 1, "course_id": 1, "text": "Привет", "status": "running", "cursor": None, "sent": 0,
+            "failed": 0, **fields}
+
+
+def new_runner(bot, owner="bot-1", batch_size=2):
+    return BroadcastRunner(BroadcastSender(bot, global_rate=1000, per_chat_rate=1000),
+                           batch_size=batch_size, concurrency=5, owner=owner, retry_delay=0)
+
+
+async def wait_done(runner):
+    while runner._tasks:
+        await asyncio.sleep(0.01)
+
+
+def test_retry_after_pauses_and_resends(bot, telegram):
+    telegram.retry_after[10] = [1, 1]
+
+    async def scenario():
+        sender = BroadcastSender(bot, global_rate=1000, per_chat_rate=1000)
+        started_at = time.monotonic()
+        delivered = await sender.send(10, "Привет")
+        # Следующее сообщение в другой чат тоже ждёт паузу из ответа 429
+        await sender.send(11, "Привет")
+        return delivered, started_at
+
+    delivered, started_at = asyncio.run(scenario())
+
+    assert delivered is True
+    assert telegram.calls[10] == 2
+    assert [chat_id for chat_id, _, _ in telegram.delivered] == [10, 11]
+    assert telegram.delivered[0][2] - started_at >= 0.95
+    assert telegram.delivered[1][2] - started_at >= 0.95
+
+
+def test_blocked_users_are_skipped(bot, telegram, monkeypatch):
+    telegram.blocked = {2, 4}
+    backend = FakeBroadcastBackend(range(1, 6), make_broadcast())
+    backend.install(monkeypatch)
+
+    async def scenario():
+        runner = new_runner(bot)
+        runner.start(backend.broadcast)
+        await wait_done(runner)
+
+    asyncio.run(scenario())
+
+    assert sorted(chat_id for chat_id, _, _ in telegram.delivered) == [1, 3, 5]
+    # Заблокировавшим бота не отправляем повторно
+    assert telegram.calls[2] == 1 and telegram.calls[4] == 1
+    assert backend.broadcast["status"] == "done"
+    assert (backend.broadcast["sent"], backend.broadcast["failed"]) == (3, 2)
+
+
+def test_resume_continues_from_stored_cursor(bot, telegram, monkeypatch):
+    backend = FakeBroadcastBackend(range(1, 8), make_broadcast())
+    backend.hang_after_update = 1
+    backend.install(monkeypatch)
+
+    async def scenario():
+        # Первый процесс отправляет одну пачку, сохраняет курсор и падает
+        crashed_runner = new_runner(bot, owner="bot-1", batch_size=3)
+        await crashed_runner.resume()
+        await backend.crashed.wait()
+        await crashed_runner.stop()
+        first_run = [chat_id for chat_id, _, _ in telegram.delivered]
+
+        # Пока аренда упавшего процесса не истекла, рассылку никто не берёт
+        runner = new_runner(bot, owner="bot-2", batch_size=3)
+        await runner.resume()
+        await wait_done(runner)
+        assert [chat_id for chat_id, _, _ in telegram.delivered] == first_run
+
+        # Новый процесс продолжает незавершённую рассылку после истечения аренды
+        backend.lease_expired = True
+        await runner.resume()
+        await wait_done(runner)
+        return first_run
+
+    first_run = asyncio.run(scenario())
+
+    assert sorted(first_run) == [1, 2, 3]
+    assert sorted(chat_id for chat_id, _, _ in telegram.delivered) == list(range(1, 8))
+    assert backend.broadcast["status"] == "done"
+    assert backend.broadcast["cursor"] == 7
+    assert backend.broadcast["sent"] == 7
+
+
+def test_two_replicas_do_not_send_the_same_broadcast(bot, telegram, monkeypatch):
+    backend = FakeBroadcastBackend(range(1, 6), make_broadcast())
+    backend.install(monkeypatch)
+
+    async def scenario():
+        replicas = [new_runner(bot, owner="bot-1"), new_runner(bot, owner="bot-2")]
+        for runner in replicas:
+            await runner.resume()
+        for runner in replicas:
+            await wait_done(runner)
+
+    asyncio.run(scenario())
+
+    assert sorted(chat_id for chat_id, _, _ in telegram.delivered) == [1, 2, 3, 4, 5]
+    assert backend.broadcast["status"] == "done"
+
+
+def test_progress_is_retried_until_saved(bot, telegram, monkeypatch):
+    backend = FakeBroadcastBackend(range(1, 5), make_broadcast())
+    backend.failing_updates = 2
+    backend.install(monkeypatch)
+
+    async def scenario():
+        runner = new_runner(bot)
+        runner.start(backend.broadcast)
+        await wait_done(runner)
+
+    asyncio.run(scenario())
+
+    assert sorted(chat_id for chat_id, _, _ in telegram.delivered) == [1, 2, 3, 4]
+    assert backend.broadcast["status"] == "done"
+    assert backend.broadcast["cursor"] == 4
+
+
+def test_unsaved_progress_stops_the_broadcast(bot, telegram, monkeypatch):
+    backend = FakeBroadcastBackend(range(1, 7), make_broadcast())
+    backend.failing_updates = 3
+    backend.install(monkeypatch)
+
+    async def scenario():
+        runner = new_runner(bot)
+        runner.start(backend.broadcast)
+        await wait_done(runner)
+
+    asyncio.run(scenario())
+
+    # Курсор не сохранён: следующие пачки не отправляются, рассылка остаётся незавершённой
+    assert sorted(chat_id for chat_id, _, _ in telegram.delivered) == [1, 2]
+    assert backend.broadcast["status"] == "running"
+    assert backend.broadcast["cursor"] is None
+
+
+def test_unexpected_error_is_logged_and_marks_broadcast_failed(bot, telegram, monkeypatch, caplog):
+    backend = FakeBroadcastBackend(range(1, 7), make_broadcast())
+    backend.fail_recipients_after = 2
+    backend.install(monkeypatch)
+
+    async def scenario():
+        runner = new_runner(bot)
+        runner.start(backend.broadcast)
+        await wait_done(runner)
+
+    with caplog.at_level(logging.ERROR, logger="broadcast"):
+        asyncio.run(scenario())
+
+    assert backend.broadcast["status"] == "failed"
+    assert (backend.broadcast["cursor"], backend.broadcast["sent"]) == (2, 2)
+    assert any(record.exc_info for record in caplog.records)
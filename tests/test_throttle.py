@@ -0,0 +1,73 @@
+import asyncio
+
+from aiogram import Dispatcher
+from aiogram.types import CallbackQuery, Update
+
+from throttle import MemoryThrottleStore, ThrottleMiddleware
+from updates import UpdateQueue
+
+
+def callback_update(bot, update_id, user_id, data):
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": "Студент"},
+            "chat_instance": "1",
+            "data": data,
+            "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "text": "Меню"},
+        },
+    }, context={"bot": bot})
+
+
+def make_dispatcher(handled, debounce):
+    dp = Dispatcher()
+    dp.callback_query.outer_middleware(
+        ThrottleMiddleware(MemoryThrottleStore(maxsize=100), rate=1000, burst=1000, inflight_ttl=30,
+                           debounce=debounce)
+    )
+
+    @dp.callback_query()
+    async def handler(callback: CallbackQuery):
+        handled.append((callback.id, callback.data))
+        await asyncio.sleep(0.05)
+        await callback.answer("Готово")
+
+    return dp
+
+
+def test_duplicate_taps_are_coalesced_through_update_queue(bot, telegram):
+    handled = []
+
+    async def scenario():
+        queue = UpdateQueue(bot, make_dispatcher(handled, debounce=0.5), workers=2, maxsize=10)
+        queue.start()
+        # Двойное нажатие: обновления одного чата выполняются по порядку в одном шарде,
+        # и второе доходит до троттлинга уже после завершения первого
+        for update_id, data in ((1, "enroll:1"), (2, "enroll:1"), (3, "leave:1")):
+            assert await queue.submit(callback_update(bot, update_id, 10, data), timeout=1)
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+    assert handled == [("1", "enroll:1"), ("3", "leave:1")]
+    # Повторное нажатие получает пустой ответ, чтобы у кнопки пропали часики
+    assert sorted(telegram.answered) == [("1", "Готово"), ("2", None), ("3", "Готово")]
+
+
+def test_same_tap_is_handled_again_after_debounce(bot, telegram):
+    handled = []
+
+    async def scenario():
+        queue = UpdateQueue(bot, make_dispatcher(handled, debounce=0.1), workers=1, maxsize=10)
+        queue.start()
+        await queue.submit(callback_update(bot, 1, 10, "enroll:1"), timeout=1)
+        await queue.stop()
+        await asyncio.sleep(0.15)
+        queue.start()
+        await queue.submit(callback_update(bot, 2, 10, "enroll:1"), timeout=1)
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+    assert [data for _, data in handled] == ["enroll:1", "enroll:1"]